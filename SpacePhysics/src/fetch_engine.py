@@ -0,0 +1,235 @@
+''' coding: utf-8
+INFO: 统一的异步下载引擎. 各爬虫以数据集定义 (get_dataset) 的形式提供下载
+      任务, 引擎在一个进程中并发执行所有数据集, 按主机限制并发数, 失败后
+      退避重试.
+date: 2026-10-18 Washy [CUG washy21@163.com]
+func:
+    make_task           - 生成下载任务
+    make_dataset        - 生成数据集定义
+    register_backend    - 注册连接后端
+    fetch_datasets      - 并发执行多个数据集的下载任务
+'''
+
+import time
+import random
+import asyncio
+import threading
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ftp_utils import ftp_open
+from ftp_utils import ftp_close
+from http_utils import http_session
+
+##----------------------------------------------------------------------##
+# INFO: 默认参数
+##----------------------------------------------------------------------##
+#   HOST_LIMITS     - 各主机的并发连接数上限
+#   DEFAULT_LIMIT   - 未列出主机的并发连接数上限
+#   RETRIES         - 失败后的重试次数
+#   BACKOFF         - 首次重试前的等待时间 [s], 之后每次加倍
+##----------------------------------------------------------------------##
+HOST_LIMITS = {
+    'ftp.gipp.org.cn': 4,
+    'ftp.swpc.noaa.gov': 2,
+    'wdc.kugi.kyoto-u.ac.jp': 2,
+    'swarm-diss.eo.esa.int': 4,
+}
+DEFAULT_LIMIT = 2
+RETRIES = 3
+BACKOFF = 2.0
+
+##----------------------------------------------------------------------##
+# INFO: 连接后端 {名称: (打开连接函数(host,limit), 关闭连接函数(conn))}
+##----------------------------------------------------------------------##
+#   'ftp'   - 匿名登录的ftp连接, 任务函数第一个参数为ftp
+#   'http'  - 带连接池的requests会话, 任务函数第一个参数为session
+#   'call'  - 无连接, 任务函数第一个参数为None
+##----------------------------------------------------------------------##
+BACKENDS = {
+    'ftp': (lambda host, limit: ftp_open(host), ftp_close),
+    'http': (lambda host, limit: http_session(limit), lambda s: s.close()),
+    'call': (lambda host, limit: None, lambda conn: None),
+}
+
+##----------------------------------------------------------------------##
+# INFO: 注册连接后端
+##----------------------------------------------------------------------##
+# Inputs:
+#   name            - 后端名称
+#   open_conn       - 打开连接函数 open_conn(host,limit) -> conn
+#   close_conn      - 关闭连接函数 close_conn(conn)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def register_backend(name, open_conn, close_conn):
+    BACKENDS[name] = (open_conn, close_conn)
+
+##----------------------------------------------------------------------##
+# INFO: 生成下载任务
+##----------------------------------------------------------------------##
+#   任务执行时调用 func(conn, *args). func返回任务列表时, 引擎继续执行
+#   这些任务 (用于先获取列表再下载的数据集).
+##----------------------------------------------------------------------##
+# Inputs:
+#   backend         - 连接后端 'ftp'/'http'/'call'
+#   host            - 主机名
+#   func            - 任务函数
+#   *args           - 任务函数参数
+#   name            - 任务名称 (用于提示信息)
+# Outputs:
+#   task            - 任务 [dict]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def make_task(backend, host, func, *args, name=None):
+    return {'backend': backend, 'host': host, 'func': func, 'args': args,
+        'name': name or func.__name__}
+
+##----------------------------------------------------------------------##
+# INFO: 生成数据集定义
+##----------------------------------------------------------------------##
+# Inputs:
+#   name            - 数据集名称
+#   tasks           - 任务列表
+#   finalize        - 全部任务完成后调用的函数 (如保存同步清单), 可为None
+# Outputs:
+#   dataset         - 数据集 [dict]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def make_dataset(name, tasks, finalize=None):
+    return {'name': name, 'tasks': tasks, 'finalize': finalize}
+
+##----------------------------------------------------------------------##
+# INFO: 在工作线程中执行任务 (从空闲连接中取出连接, 失败时丢弃连接)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def call_task(task, state):
+    key = (task['backend'], task['host'])
+    open_conn, close_conn = BACKENDS[task['backend']]
+
+    with state['lock']:
+        idle = state['idle'].setdefault(key, [])
+        conn = idle.pop() if len(idle) > 0 else None
+    if conn is None:
+        conn = open_conn(task['host'], state['limits'](task['host']))
+
+    try:
+        result = task['func'](conn, *task['args'])
+    except StopIteration as err:
+        # StopIteration无法传入asyncio的Future (会导致任务挂起)
+        close_conn(conn)
+        raise RuntimeError('StopIteration: {}'.format(err)) from err
+    except BaseException:
+        close_conn(conn)
+        raise
+
+    with state['lock']:
+        state['idle'][key].append(conn)
+
+    return result
+
+##----------------------------------------------------------------------##
+# INFO: 执行任务 (按主机限制并发, 失败后退避重试), 返回失败的任务
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+async def run_task(task, state):
+    key = (task['backend'], task['host'])
+    if key not in state['sems']:
+        state['sems'][key] = asyncio.Semaphore(state['limits'](task['host']))
+    sem = state['sems'][key]
+
+    loop = asyncio.get_running_loop()
+    for attempt in range(state['retries']+1):
+        async with sem:
+            try:
+                result = await loop.run_in_executor(state['executor'],
+                    call_task, task, state)
+                break
+            except Exception:
+                error = traceback.format_exc()
+        print('WARNING: {:s} 失败 ({:d}/{:d})\n{:s}'.format(task['name'],
+            attempt+1, state['retries']+1, error), end='')
+        if attempt < state['retries']:
+            # 指数退避, 加随机抖动避免同时重试
+            await asyncio.sleep(state['backoff'] * 2**attempt * \
+                (1 + random.random()/2))
+    else:
+        return [(task['name'], error)]
+
+    # 任务返回新的任务列表时继续执行
+    if isinstance(result, list):
+        return await run_tasks(result, state)
+    return []
+
+async def run_tasks(tasks, state):
+    results = await asyncio.gather(*[run_task(each, state) for each in tasks])
+    return [each for result in results for each in result]
+
+##----------------------------------------------------------------------##
+# INFO: 执行一个数据集 (全部任务完成后调用finalize)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+async def run_dataset(dataset, state):
+    t0 = time.time()
+    failed = await run_tasks(dataset['tasks'], state)
+    if dataset['finalize'] is not None:
+        await asyncio.get_running_loop().run_in_executor(state['executor'],
+            dataset['finalize'])
+    print('{:s}: 完成, 用时{:.1f}s, 失败{:d}个任务'.format(dataset['name'],
+        time.time()-t0, len(failed)))
+
+    return failed
+
+##----------------------------------------------------------------------##
+# INFO: 并发执行多个数据集的下载任务
+##----------------------------------------------------------------------##
+# Inputs:
+#   datasets        - 数据集列表 (make_dataset)
+#   limits          - 各主机并发数上限 {host: n}, 默认HOST_LIMITS
+#   retries         - 失败后的重试次数
+#   backoff         - 首次重试前的等待时间 [s]
+# Outputs:
+#   failed          - {数据集名称: [(任务名称, 异常信息), ...]}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def fetch_datasets(datasets, limits=None, retries=RETRIES, backoff=BACKOFF):
+    limits = dict(HOST_LIMITS if limits is None else limits)
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=sum(limits.values()) + \
+            DEFAULT_LIMIT*len(datasets)) as executor:
+            state = {
+                'limits': lambda host: limits.get(host, DEFAULT_LIMIT),
+                'sems': {},
+                'idle': {},
+                'lock': threading.Lock(),
+                'executor': executor,
+                'retries': retries,
+                'backoff': backoff,
+            }
+            try:
+                results = await asyncio.gather(*[run_dataset(each, state)
+                    for each in datasets])
+            finally:
+                # 关闭所有空闲连接
+                for (backend, host), conns in state['idle'].items():
+                    for conn in conns:
+                        BACKENDS[backend][1](conn)
+
+        return {each['name']: result for each, result in zip(datasets,results)}
+
+    return asyncio.run(main())
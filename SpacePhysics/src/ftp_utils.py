@@ -0,0 +1,557 @@
+''' coding: utf-8
+INFO: 各ftp爬虫共用的工具函数.
+date: 2026-10-18 Washy [CUG washy21@163.com]
+func:
+    ftp_open            - 匿名登录ftp服务器
+    ftp_close           - 断开ftp连接
+    ftp_listdir         - 获取ftp文件夹列表 (按主机及文件夹缓存)
+    ftp_globdir         - 获取满足匹配规则的文件名列表
+    ftp_clearcache      - 清除文件夹列表缓存
+    ftp_stat            - 获取ftp文件属性
+    ftp_mlst            - 获取单个ftp文件属性 (不获取文件夹列表)
+    is_ftp_file         - 判断文件在ftp中是否存在
+    ftp_retrieve        - 以大块缓冲区接收ftp文件
+    ftp_iter_chunks     - 逐块接收ftp文件 (生成器, 边接收边处理)
+    ftp_download        - 断点续传下载ftp文件
+    ftp_pool            - 创建ftp连接池
+    ftp_pooled          - 使用连接池中的ftp执行函数 (断开时重连重试)
+    ftp_close_pool      - 断开连接池中的全部ftp
+'''
+
+import os
+import json
+import time
+import queue
+import socket
+import fnmatch
+import threading
+import posixpath
+
+from ftplib import FTP
+from ftplib import error_perm
+from ftplib import error_temp
+from ftplib import error_reply
+from ftplib import all_errors
+
+##----------------------------------------------------------------------##
+# INFO: 文件夹列表缓存
+##----------------------------------------------------------------------##
+#   LIST_CACHE      - {(host,dirpath): (获取时间, {文件名: 属性})}
+#   LIST_TTL        - 缓存有效时间 [s]
+#   MLSD_UNSUPPORTED - 不支持MLSD命令的主机
+##----------------------------------------------------------------------##
+LIST_CACHE = {}
+LIST_TTL = 300
+MLSD_UNSUPPORTED = set()
+LIST_LOCK = threading.Lock()
+
+# 连接断开类异常 (重新连接后可重试)
+FTP_CONN_ERRORS = (OSError, EOFError, error_temp, error_reply)
+
+##----------------------------------------------------------------------##
+# INFO: 传输参数
+##----------------------------------------------------------------------##
+#   FTP_BLOCKSIZE   - 初始接收块大小 [byte]
+#   FTP_MAXBLOCKSIZE - 最大接收块大小 [byte], 接收块被填满时逐步加倍
+#   FTP_WRITEBUFFER - 本地文件写缓冲区大小 [byte]
+##----------------------------------------------------------------------##
+FTP_BLOCKSIZE = 1<<16
+FTP_MAXBLOCKSIZE = 1<<20
+FTP_WRITEBUFFER = 1<<20
+
+##----------------------------------------------------------------------##
+# INFO: 匿名登录ftp服务器 (连接失败时抛出异常, 由调用者重试)
+##----------------------------------------------------------------------##
+# Inputs:
+#   host            - 主机名
+#   port            - 端口号
+#   timeout         - 超时时间 [s]
+# Outputs:
+#   ftp             - ftp
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_open(host, port=21, timeout=60):
+    ftp = FTP(timeout=timeout)
+    ftp.encoding = 'utf-8'
+    ftp.connect(host, port)
+    ftp.login()
+
+    return ftp
+
+##----------------------------------------------------------------------##
+# INFO: 断开ftp连接 (QUIT失败时直接关闭)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_close(ftp):
+    try:
+        ftp.quit()
+    except Exception:
+        ftp.close()
+
+##----------------------------------------------------------------------##
+# INFO: 解析LIST命令返回的一行 (ls -l 格式)
+##----------------------------------------------------------------------##
+# Inputs:
+#   line            - LIST返回的一行
+# Outputs:
+#   name            - 文件名, 无法解析时为None
+#   facts           - 文件属性 {'type','size'}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def parse_list_line(line):
+    parts = line.split(None, 8)
+    # 仅有文件名
+    if len(parts) == 1:
+        return parts[0], {}
+    if len(parts) < 9:
+        return None, {}
+
+    name = parts[8]
+    facts = {}
+    if parts[0].startswith('d'):
+        facts['type'] = 'dir'
+    elif parts[0].startswith('l'):
+        facts['type'] = 'link'
+        name = name.split(' -> ')[0]
+    else:
+        facts['type'] = 'file'
+    if parts[4].isdigit():
+        facts['size'] = parts[4]
+
+    return name, facts
+
+##----------------------------------------------------------------------##
+# INFO: 获取ftp文件夹列表 (每个主机及文件夹在有效时间内只获取一次)
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp
+#   dirpath         - 文件夹路径, ''或相对路径时相对于当前文件夹
+#   ttl             - 缓存有效时间 [s]
+# Outputs:
+#   entries         - {文件名: 属性}, 属性来自MLSD (type/size/modify)
+#                     或LIST (type/size)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_listdir(ftp, dirpath='', ttl=LIST_TTL):
+    # 缓存键使用绝对路径 (相对路径每次需一条PWD命令, 频繁查询时应传入
+    # 绝对路径)
+    if not dirpath.startswith('/'):
+        dirpath = posixpath.join(ftp.pwd(), dirpath)
+    dirpath = posixpath.normpath(dirpath)
+    key = (ftp.host, dirpath)
+
+    with LIST_LOCK:
+        if key in LIST_CACHE and time.time()-LIST_CACHE[key][0] < ttl:
+            return LIST_CACHE[key][1]
+
+    entries = {}
+    if ftp.host not in MLSD_UNSUPPORTED:
+        try:
+            for name, facts in ftp.mlsd(dirpath, ['type','size','modify']):
+                if facts.get('type') in ('cdir','pdir'):
+                    continue
+                entries[name] = facts
+        except error_perm as e:
+            # 500/502: 命令不支持, 改用LIST
+            if not str(e).startswith(('500','502')):
+                raise
+            MLSD_UNSUPPORTED.add(ftp.host)
+
+    if ftp.host in MLSD_UNSUPPORTED:
+        lines = []
+        ftp.dir(dirpath, lines.append)
+        for line in lines:
+            name, facts = parse_list_line(line)
+            if name is None:
+                continue
+            entries[posixpath.basename(name)] = facts
+
+    with LIST_LOCK:
+        LIST_CACHE[key] = (time.time(), entries)
+
+    return entries
+
+##----------------------------------------------------------------------##
+# INFO: 获取ftp文件夹中满足匹配规则的文件名列表 (按文件名排序)
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp
+#   regular_rules   - 文件名匹配规则, 如 '*_ace_mag_1m.txt'
+#   dirpath         - 文件夹路径
+# Outputs:
+#   filenames       - 满足匹配规则的文件名列表
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_globdir(ftp, regular_rules, dirpath=''):
+    entries = ftp_listdir(ftp, dirpath)
+    return sorted(fnmatch.filter(entries.keys(), regular_rules))
+
+##----------------------------------------------------------------------##
+# INFO: 清除文件夹列表缓存
+##----------------------------------------------------------------------##
+# Inputs:
+#   host            - 主机名, None时清除全部
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_clearcache(host=None):
+    with LIST_LOCK:
+        for key in list(LIST_CACHE.keys()):
+            if host is None or key[0] == host:
+                del LIST_CACHE[key]
+
+##----------------------------------------------------------------------##
+# INFO: 获取ftp文件属性 (使用文件夹列表缓存)
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp_conn        - ftp
+#   filename        - 文件名, 可包含文件夹路径
+# Outputs:
+#   remote          - 文件属性 {'size','modify'}, 文件不存在时为None
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_stat(ftp_conn, filename):
+    dirpath, name = posixpath.split(filename)
+    try:
+        entries = ftp_listdir(ftp_conn, dirpath)
+    except error_perm:
+        return None
+    if name not in entries:
+        return None
+
+    return {k: v for k, v in entries[name].items() if k != 'type'}
+
+##----------------------------------------------------------------------##
+# INFO: 获取单个ftp文件属性 (MLST, 不支持时用SIZE/MDTM), 不获取文件夹列表
+##----------------------------------------------------------------------##
+#   只需少数文件时比获取整个文件夹列表快得多.
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp
+#   filename        - 文件名, 可包含文件夹路径
+# Outputs:
+#   remote          - 文件属性 {'size','modify'}, 文件不存在时为None
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_mlst(ftp, filename):
+    if ftp.host not in MLSD_UNSUPPORTED:
+        try:
+            res = ftp.sendcmd('MLST ' + filename)
+        except error_perm as e:
+            # 550: 文件不存在
+            if str(e).startswith('550'):
+                return None
+            if not str(e).startswith(('500','502')):
+                raise
+            MLSD_UNSUPPORTED.add(ftp.host)
+        else:
+            # 250-... / ' type=file;size=...;modify=...; name' / 250 End
+            for line in res.splitlines()[1:]:
+                if line.startswith(' '):
+                    facts = {}
+                    for fact in line.strip().partition(' ')[0].split(';'):
+                        key, _, value = fact.partition('=')
+                        if key:
+                            facts[key.lower()] = value
+                    if facts.get('type', 'file') != 'file':
+                        return None
+                    return {k: facts[k] for k in ('size','modify') if k in facts}
+
+    # SIZE / MDTM
+    try:
+        ftp.voidcmd('TYPE I')
+        size = ftp.size(filename)
+    except error_perm:
+        return None
+    remote = {'size': str(size)}
+    try:
+        remote['modify'] = ftp.sendcmd('MDTM ' + filename).split()[-1]
+    except error_perm:
+        pass
+
+    return remote
+
+##----------------------------------------------------------------------##
+# INFO: 判断文件在ftp中是否存在 (使用文件夹列表缓存)
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp_conn        - ftp
+#   filename        - 需判断的文件名, 可包含文件夹路径
+# Outputs:
+#   flag            - bool值 True/False 存在/不存在
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/21,23; 07/11; 2026/10/18
+##----------------------------------------------------------------------##
+def is_ftp_file(ftp_conn, filename):
+    return ftp_stat(ftp_conn, filename) is not None
+
+##----------------------------------------------------------------------##
+# INFO: 读取/删除未完成下载 (.part) 对应的远程属性
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def read_partinfo(partpath):
+    infopath = partpath + '.json'
+    if not os.path.exists(infopath):
+        return None
+    with open(infopath, 'r') as f:
+        return json.load(f)
+
+def remove_part(partpath):
+    for each in (partpath, partpath + '.json'):
+        if os.path.exists(each):
+            os.remove(each)
+
+##----------------------------------------------------------------------##
+# INFO: 以大块缓冲区接收ftp文件 (替代retrbinary的逐块回调)
+##----------------------------------------------------------------------##
+#   使用recv_into写入预分配的缓冲区, 每次接收填满缓冲区时加倍, 直至
+#   maxblocksize.
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp
+#   filename        - ftp文件名
+#   f               - 已打开的本地文件 (二进制写)
+#   rest            - 续传位置 [byte], None时从头下载
+#   blocksize       - 初始接收块大小 [byte]
+#   maxblocksize    - 最大接收块大小 [byte]
+# Outputs:
+#   nbytes          - 接收的字节数
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_retrieve(ftp, filename, f, rest=None, blocksize=FTP_BLOCKSIZE,
+    maxblocksize=FTP_MAXBLOCKSIZE):
+    nbytes = 0
+    ftp.voidcmd('TYPE I')
+    with ftp.transfercmd('RETR ' + filename, rest) as conn:
+        # 增大接收缓冲区
+        try:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, maxblocksize)
+        except OSError:
+            pass
+
+        buf = bytearray(blocksize)
+        view = memoryview(buf)
+        while True:
+            n = conn.recv_into(view)
+            if not n:
+                break
+            f.write(view[:n])
+            nbytes += n
+            # 缓冲区被填满: 加倍
+            if n == len(buf) and len(buf) < maxblocksize:
+                view.release()
+                buf = bytearray(min(len(buf)*2, maxblocksize))
+                view = memoryview(buf)
+        view.release()
+    ftp.voidresp()
+
+    return nbytes
+
+##----------------------------------------------------------------------##
+# INFO: 逐块接收ftp文件 (生成器, 边接收边处理)
+##----------------------------------------------------------------------##
+#   接收缓冲区增大至maxblocksize, 处理数据期间内核继续接收, 网络与计算
+#   重叠. 提前结束迭代时关闭数据连接并读取服务器响应, ftp连接仍可使用.
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp
+#   filename        - ftp文件名
+#   size            - 文件大小 [byte], 不为None时接收完成后校验
+#   blocksize       - 接收块大小 [byte]
+#   maxblocksize    - 接收缓冲区大小 [byte]
+# Outputs:
+#   chunks          - 数据块的生成器 [bytes]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_iter_chunks(ftp, filename, size=None, blocksize=FTP_BLOCKSIZE,
+    maxblocksize=FTP_MAXBLOCKSIZE):
+    nbytes = 0
+    done = False
+    ftp.voidcmd('TYPE I')
+    conn = ftp.transfercmd('RETR ' + filename)
+    try:
+        # 增大接收缓冲区
+        try:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, maxblocksize)
+        except OSError:
+            pass
+
+        while True:
+            data = conn.recv(blocksize)
+            if not data:
+                break
+            nbytes += len(data)
+            yield data
+        done = True
+    finally:
+        conn.close()
+        if not done:
+            # 传输被中断, 服务器返回426等错误响应
+            try:
+                ftp.voidresp()
+            except all_errors:
+                pass
+    ftp.voidresp()
+
+    # 校验文件大小
+    if size is not None and nbytes != int(size):
+        raise IOError('下载不完整: {} ({:d}/{:d} byte)'.format(
+            filename, nbytes, int(size)))
+
+##----------------------------------------------------------------------##
+# INFO: 断点续传下载ftp文件
+##----------------------------------------------------------------------##
+#   先写入savepath.part, 已有.part且远程文件未变化时用REST从已下载位置
+#   继续; 下载完成后校验大小并重命名为savepath, 中断时不留下不完整的
+#   savepath.
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp
+#   filename        - ftp文件名, 可包含文件夹路径
+#   savepath        - 本地保存文件路径
+#   remote          - 远程属性 {'size','modify'} (ftp_stat), None时不校验
+#   blocksize       - 初始接收块大小 [byte]
+#   maxblocksize    - 最大接收块大小 [byte]
+# Outputs:
+#   nbytes          - 本次接收的字节数
+#   seconds         - 本次传输用时 [s]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_download(ftp, filename, savepath, remote=None,
+    blocksize=FTP_BLOCKSIZE, maxblocksize=FTP_MAXBLOCKSIZE):
+    partpath = savepath + '.part'
+    remote = remote or {}
+    size = int(remote['size']) if remote.get('size') is not None else None
+
+    # 已下载位置 (远程文件变化或.part大于远程文件时重新下载)
+    offset = 0
+    if os.path.exists(partpath):
+        offset = os.path.getsize(partpath)
+        if read_partinfo(partpath) != remote or \
+            (size is not None and offset > size):
+            remove_part(partpath)
+            offset = 0
+
+    # 记录远程属性, 供下次续传时判断
+    with open(partpath + '.json', 'w') as f:
+        json.dump(remote, f)
+
+    nbytes = 0
+    t0 = time.time()
+    if size is None or offset < size:
+        try:
+            with open(partpath, 'ab', buffering=FTP_WRITEBUFFER) as f:
+                nbytes = ftp_retrieve(ftp, filename, f,
+                    offset if offset > 0 else None, blocksize, maxblocksize)
+        except (error_perm, error_reply) as e:
+            # 服务器不支持REST时从头下载
+            if offset == 0 or not str(e).startswith(('500','502','504','554')):
+                raise
+            remove_part(partpath)
+            return ftp_download(ftp, filename, savepath, remote,
+                blocksize, maxblocksize)
+    seconds = time.time() - t0
+
+    # 校验文件大小
+    if size is not None and os.path.getsize(partpath) != size:
+        raise IOError('下载不完整: {} ({:d}/{:d} byte)'.format(
+            filename, os.path.getsize(partpath), size))
+
+    os.replace(partpath, savepath)
+    os.remove(partpath + '.json')
+
+    # 传输速率
+    print('  {:s}: {:.2f} MB, {:.2f} MB/s'.format(posixpath.basename(filename),
+        nbytes/1e6, nbytes/1e6/max(seconds,1e-6)))
+
+    return nbytes, seconds
+
+##----------------------------------------------------------------------##
+# INFO: 创建ftp连接池 (使用时再连接)
+##----------------------------------------------------------------------##
+# Inputs:
+#   host            - 主机名
+#   nconn           - 连接数上限
+#   port            - 端口号
+# Outputs:
+#   pool            - 连接池 {'host','port','idle'}, idle中None表示未连接
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_pool(host, nconn, port=21):
+    idle = queue.Queue()
+    for i in range(nconn):
+        idle.put(None)
+
+    return {'host': host, 'port': port, 'idle': idle}
+
+##----------------------------------------------------------------------##
+# INFO: 使用连接池中的ftp执行函数, 连接断开时重新连接后重试
+##----------------------------------------------------------------------##
+# Inputs:
+#   pool            - 连接池 (ftp_pool)
+#   func            - 执行函数 func(ftp, *args, **kwargs)
+#   *args           - 函数参数
+#   retries         - 连接断开后的重试次数
+#   **kwargs        - 函数关键字参数
+# Outputs:
+#   result          - 函数返回值; 重试后仍失败时抛出最后一次的异常
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_pooled(pool, func, *args, retries=2, **kwargs):
+    # 取出一个连接, 用完后放回
+    ftp = pool['idle'].get()
+    try:
+        for i in range(retries+1):
+            try:
+                if ftp is None:
+                    ftp = ftp_open(pool['host'], pool['port'])
+                return func(ftp, *args, **kwargs)
+            except FTP_CONN_ERRORS as e:
+                if ftp is not None:
+                    ftp.close()
+                    ftp = None
+                if i == retries:
+                    raise
+                print('WARNING: 连接断开, 重新连接 ({})'.format(e))
+    finally:
+        pool['idle'].put(ftp)
+
+##----------------------------------------------------------------------##
+# INFO: 断开连接池中的全部ftp
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ftp_close_pool(pool):
+    while not pool['idle'].empty():
+        ftp = pool['idle'].get()
+        if ftp is not None:
+            ftp_close(ftp)
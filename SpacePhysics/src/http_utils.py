@@ -0,0 +1,190 @@
+''' coding: utf-8
+INFO: 各http爬虫共用的工具函数.
+date: 2026-10-18 Washy [CUG washy21@163.com]
+func:
+    set_rate_limit      - 设置主机的请求速率限制
+    rate_limit          - 按主机限制请求速率 (令牌桶)
+    http_session        - 创建带连接池的会话
+    http_download       - 断点续传下载http文件
+'''
+
+import os
+import json
+import time
+import requests
+import threading
+
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+##----------------------------------------------------------------------##
+# INFO: 各主机的请求速率限制 {host: (每秒请求数, 突发请求数)}
+##----------------------------------------------------------------------##
+RATE_LIMITS = {
+    'wdc.kugi.kyoto-u.ac.jp': (1.0, 4),
+}
+# 令牌桶 {host: {'rate','burst','tokens','time','lock'}}
+BUCKETS = {}
+BUCKETS_LOCK = threading.Lock()
+
+##----------------------------------------------------------------------##
+# INFO: 设置主机的请求速率限制
+##----------------------------------------------------------------------##
+# Inputs:
+#   host            - 主机名
+#   rate            - 持续请求速率 [次/s], None时取消限制
+#   burst           - 突发请求数 (空闲后可连续发出的请求数)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def set_rate_limit(host, rate, burst=1):
+    with BUCKETS_LOCK:
+        if rate is None:
+            RATE_LIMITS.pop(host, None)
+        else:
+            RATE_LIMITS[host] = (rate, burst)
+        BUCKETS.pop(host, None)
+
+##----------------------------------------------------------------------##
+# INFO: 按主机限制请求速率 (令牌桶), 每次请求前调用
+##----------------------------------------------------------------------##
+#   令牌以rate的速率补充, 最多积累burst个; 没有令牌时预约下一个令牌并
+#   等待, 多个线程同时请求时依次排队, 总速率不超过rate.
+##----------------------------------------------------------------------##
+# Inputs:
+#   url             - 请求url或主机名
+# Outputs:
+#   wait            - 等待时间 [s]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def rate_limit(url):
+    host = urlparse(url).hostname or url
+    with BUCKETS_LOCK:
+        if host not in RATE_LIMITS:
+            return 0
+        if host not in BUCKETS:
+            rate, burst = RATE_LIMITS[host]
+            BUCKETS[host] = {'rate': rate, 'burst': burst, 'tokens': burst,
+                'time': time.monotonic(), 'lock': threading.Lock()}
+        bucket = BUCKETS[host]
+
+    with bucket['lock']:
+        # 补充令牌
+        now = time.monotonic()
+        tokens = min(bucket['burst'], bucket['tokens'] + \
+            (now - bucket['time']) * bucket['rate'])
+        # 取出一个令牌 (不足时为负, 即预约之后的令牌)
+        bucket['tokens'] = tokens - 1
+        bucket['time'] = now
+        wait = max(0, (1 - tokens) / bucket['rate'])
+
+    if wait > 0:
+        time.sleep(wait)
+
+    return wait
+
+##----------------------------------------------------------------------##
+# INFO: 创建带连接池的会话 (keep-alive, 同一主机的TLS握手在请求间复用)
+##----------------------------------------------------------------------##
+# Inputs:
+#   nconn           - 每个主机的连接数上限 (与并行下载数一致)
+#   headers         - 默认请求头
+# Outputs:
+#   session         - requests.Session
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def http_session(nconn=1, headers=None):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(nconn,1))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers is not None:
+        session.headers.update(headers)
+
+    return session
+
+##----------------------------------------------------------------------##
+# INFO: 断点续传下载http文件
+##----------------------------------------------------------------------##
+#   先写入savepath.part, 已有.part且远程文件未变化 (ETag/Last-Modified)
+#   时用Range从已下载位置继续; 下载完成后校验大小并重命名为savepath.
+##----------------------------------------------------------------------##
+# Inputs:
+#   url             - 文件url
+#   savepath        - 本地保存文件路径
+#   headers         - 请求头
+#   chunksize       - 写入块大小 [byte]
+#   session         - http_session会话, None时单独请求
+#   **kwargs        - 其他requests参数 (如verify)
+# Outputs:
+#   remote          - 远程属性 {'size','etag','last-modified'}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def http_download(url, savepath, headers=None, chunksize=1<<16, session=None,
+    **kwargs):
+    partpath = savepath + '.part'
+    infopath = partpath + '.json'
+    headers = dict(headers or {})
+
+    # 已下载位置
+    offset = 0
+    if os.path.exists(partpath) and os.path.exists(infopath):
+        offset = os.path.getsize(partpath)
+        with open(infopath, 'r') as f:
+            info = json.load(f)
+        headers['Range'] = 'bytes={:d}-'.format(offset)
+        # 远程文件变化时服务器返回完整文件 (200)
+        if info.get('etag') or info.get('last-modified'):
+            headers['If-Range'] = info.get('etag') or info['last-modified']
+
+    get = requests.get if session is None else session.get
+    with get(url, headers=headers, stream=True, **kwargs) as res:
+        # 请求范围无效 (.part已不对应远程文件), 从头下载
+        if res.status_code == 416:
+            os.remove(partpath)
+            return http_download(url, savepath, headers={k: v for k, v in
+                headers.items() if k not in ('Range','If-Range')},
+                chunksize=chunksize, session=session, **kwargs)
+        res.raise_for_status()
+
+        if res.status_code == 206:
+            # 续传: Content-Range: bytes start-end/total
+            total = res.headers.get('Content-Range','').rpartition('/')[2]
+            size = int(total) if total.isdigit() else None
+            mode = 'ab'
+        else:
+            # 完整文件
+            length = res.headers.get('Content-Length')
+            size = int(length) if length is not None and \
+                'Content-Encoding' not in res.headers else None
+            mode = 'wb'
+            # 记录远程属性, 供下次续传时判断
+            with open(infopath, 'w') as f:
+                json.dump({'etag': res.headers.get('ETag'),
+                    'last-modified': res.headers.get('Last-Modified')}, f)
+
+        with open(partpath, mode) as f:
+            for chunk in res.iter_content(chunksize):
+                f.write(chunk)
+
+        remote = {'size': None if size is None else str(size),
+            'etag': res.headers.get('ETag'),
+            'last-modified': res.headers.get('Last-Modified')}
+
+    # 校验文件大小
+    if size is not None and os.path.getsize(partpath) != size:
+        raise IOError('下载不完整: {} ({:d}/{:d} byte)'.format(
+            url, os.path.getsize(partpath), size))
+
+    os.replace(partpath, savepath)
+    if os.path.exists(infopath):
+        os.remove(infopath)
+
+    return remote
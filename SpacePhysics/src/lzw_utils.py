@@ -0,0 +1,220 @@
+''' coding: utf-8
+INFO: 流式解压Unix compress (.Z, LZW) 文件. 与unlzw3.unlzw不同, 压缩数据可
+      分块输入, 解压结果逐块输出, 不需要一次读入整个文件.
+date: 2026-10-18 Washy [CUG washy21@163.com]
+func:
+    lzw_decompressor    - 创建解压状态
+    lzw_decompress      - 输入一块压缩数据, 返回已解压的数据
+    lzw_flush           - 输入结束, 返回剩余的解压数据
+    iter_unlzw          - 逐块解压 (压缩数据块的迭代器)
+    iter_text_lines     - 将数据块转为文本行
+'''
+
+# .Z文件头 (magic, 标志字节: 低5位为最大码长, 最高位为块模式)
+LZW_MAGIC = b'\x1f\x9d'
+# 初始码长 [bit]
+LZW_INIT_BITS = 9
+# 块模式下的清表码
+LZW_CLEAR = 256
+# 读取文件的块大小 [byte]
+Z_CHUNKSIZE = 1<<16
+
+##----------------------------------------------------------------------##
+# INFO: 创建解压状态
+##----------------------------------------------------------------------##
+# Outputs:
+#   state           - 解压状态 [dict]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def lzw_decompressor():
+    return {'header': None, 'pending': bytearray()}
+
+##----------------------------------------------------------------------##
+# INFO: 清空码表 (初始化或遇到清表码时)
+##----------------------------------------------------------------------##
+def lzw_reset(state):
+    table = [bytes([i]) for i in range(256)]
+    if state['block']:
+        # 清表码不对应数据
+        table.append(b'')
+    state['table'] = table
+    state['n_bits'] = LZW_INIT_BITS
+    state['prev'] = None
+
+##----------------------------------------------------------------------##
+# INFO: 码表已满当前码长时增加码长 (在一组的开始处)
+##----------------------------------------------------------------------##
+def lzw_bits(state):
+    if len(state['table']) > (1 << state['n_bits']) - 1 and \
+        state['n_bits'] < state['maxbits']:
+        state['n_bits'] += 1
+
+    return state['n_bits']
+
+##----------------------------------------------------------------------##
+# INFO: 解析文件头
+##----------------------------------------------------------------------##
+def lzw_header(state):
+    pending = state['pending']
+    if len(pending) < 3:
+        return False
+    if bytes(pending[:2]) != LZW_MAGIC:
+        raise ValueError('不是.Z压缩数据')
+
+    flags = pending[2]
+    maxbits = flags & 0x1f
+    if maxbits < LZW_INIT_BITS or maxbits > 16:
+        raise ValueError('.Z最大码长无效: {:d}'.format(maxbits))
+    state['header'] = flags
+    state['maxbits'] = maxbits
+    state['block'] = bool(flags & 0x80)
+    del pending[:3]
+    lzw_reset(state)
+
+    return True
+
+##----------------------------------------------------------------------##
+# INFO: 解码一组码字
+##----------------------------------------------------------------------##
+#   compress以8个码字为一组写入 (每组n_bits字节); 码长增加或清表时丢弃
+#   当前组的剩余部分, 下一个码字从下一组开始.
+##----------------------------------------------------------------------##
+# Inputs:
+#   state           - 解压状态
+#   group           - 一组数据 (n_bits字节, 结尾处可更短)
+#   out             - 解压数据块列表
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def lzw_group(state, group, out):
+    table = state['table']
+    prev = state['prev']
+    n_bits = state['n_bits']
+    maxmaxcode = 1 << state['maxbits']
+    mask = (1 << n_bits) - 1
+
+    bits = int.from_bytes(group, 'little')
+    ncode = len(group)*8 // n_bits
+    for k in range(ncode):
+        # 码表已满当前码长: 下一个码字使用新码长, 从下一组开始
+        if k > 0 and len(table) > mask and n_bits < state['maxbits']:
+            break
+        code = (bits >> (k*n_bits)) & mask
+
+        if code == LZW_CLEAR and state['block']:
+            lzw_reset(state)
+            return
+
+        if code < len(table):
+            entry = table[code]
+            if prev is None and code > 255:
+                raise ValueError('.Z数据损坏: 首个码字无效')
+        elif code == len(table) and prev is not None:
+            # KwKwK
+            entry = prev + prev[:1]
+        else:
+            raise ValueError('.Z数据损坏: 码字{:d}超出码表'.format(code))
+        out.append(entry)
+
+        if prev is not None and len(table) < maxmaxcode:
+            table.append(prev + entry[:1])
+        prev = entry
+
+    state['prev'] = prev
+
+##----------------------------------------------------------------------##
+# INFO: 输入一块压缩数据, 返回已解压的数据
+##----------------------------------------------------------------------##
+# Inputs:
+#   state           - 解压状态 (lzw_decompressor)
+#   data            - 压缩数据块 [bytes]
+# Outputs:
+#   data            - 解压数据 [bytes], 可为空
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def lzw_decompress(state, data):
+    pending = state['pending']
+    pending += data
+    if state['header'] is None and not lzw_header(state):
+        return b''
+
+    out = []
+    pos = 0
+    while True:
+        # 开始新的一组之前更新码长
+        n_bits = lzw_bits(state)
+        if len(pending) - pos < n_bits:
+            break
+        lzw_group(state, pending[pos:pos+n_bits], out)
+        pos += n_bits
+    del pending[:pos]
+
+    return b''.join(out)
+
+##----------------------------------------------------------------------##
+# INFO: 输入结束, 返回剩余的解压数据 (最后一组可不足n_bits字节)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def lzw_flush(state):
+    if state['header'] is None:
+        if len(state['pending']) > 0:
+            raise ValueError('.Z文件头不完整')
+        return b''
+
+    out = []
+    if len(state['pending']) > 0:
+        lzw_bits(state)
+        lzw_group(state, bytes(state['pending']), out)
+        state['pending'].clear()
+
+    return b''.join(out)
+
+##----------------------------------------------------------------------##
+# INFO: 逐块解压
+##----------------------------------------------------------------------##
+# Inputs:
+#   chunks          - 压缩数据块的迭代器
+# Outputs:
+#   data            - 解压数据块的生成器 (不含空块)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def iter_unlzw(chunks):
+    state = lzw_decompressor()
+    for chunk in chunks:
+        data = lzw_decompress(state, chunk)
+        if data:
+            yield data
+    data = lzw_flush(state)
+    if data:
+        yield data
+
+##----------------------------------------------------------------------##
+# INFO: 将数据块转为文本行 (跨块的行拼接完整)
+##----------------------------------------------------------------------##
+# Inputs:
+#   chunks          - 数据块的迭代器 [bytes]
+#   encoding        - 文本编码
+# Outputs:
+#   lines           - 文本行的生成器 (不含换行符)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def iter_text_lines(chunks, encoding='utf-8'):
+    rest = b''
+    for chunk in chunks:
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r').decode(encoding)
+    if rest:
+        yield rest.rstrip(b'\r').decode(encoding)
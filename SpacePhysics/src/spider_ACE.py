@@ -3,84 +3,317 @@ INFO: 爬取ftp://ftp.swpc.noaa.gov/pub/lists/ace下太阳风和行星际磁场
 date: 2022-07-11 Washy [CUG washy21@163.com]
 '''
 
+import io
 import os
-import socket
+import posixpath
+import datetime
+import threading
+import numpy as np
 
-from ftplib import FTP
-from ftplib import error_perm
+from ftp_utils import ftp_open
+from ftp_utils import FTP_CONN_ERRORS
+from ftp_utils import ftp_close
+from ftp_utils import ftp_globdir
+from ftp_utils import ftp_stat
+from ftp_utils import ftp_mlst
+from ftp_utils import ftp_retrieve
+from ftp_utils import ftp_iter_chunks
+from fetch_engine import make_task
+from fetch_engine import make_dataset
+from ftp_utils import ftp_download
+from lzw_utils import iter_text_lines
+from sync_manifest import is_synced
+from sync_manifest import load_manifest
+from sync_manifest import save_manifest
+from sync_manifest import update_manifest
 
+# 列式存储: 每个数据模式一个文件夹 (foldpath/store), 每列一个二进制文件,
+# 第i个值为ACE_EPOCH后第i分钟的记录, 没有数据的分钟为缺测值
+ACE_EPOCH = np.datetime64('1997-01-01T00:00', 'm')
+# ACE_EPOCH的简化儒略日 (文件第5列)
+ACE_EPOCH_MJD = 50449
+# 各数据模式的列 (名称, 文件中的列号, 类型)
+ACE_COLUMNS = {
+    'mag_1m': (
+        ('status', 6, '<i1'),       # 状态 0正常 1-8异常 9无数据
+        ('bx', 7, '<f4'),           # GSM坐标磁场 [nT]
+        ('by', 8, '<f4'),
+        ('bz', 9, '<f4'),
+        ('bt', 10, '<f4'),          # 总磁场 [nT]
+        ('lat', 11, '<f4'),         # 磁场纬度/经度 [deg]
+        ('lon', 12, '<f4'),
+    ),
+    'swepam_1m': (
+        ('status', 6, '<i1'),
+        ('density', 7, '<f4'),      # 质子数密度 [p/cc]
+        ('speed', 8, '<f4'),        # 太阳风速度 [km/s]
+        ('temperature', 9, '<f4'),  # 离子温度 [K]
+    ),
+}
+# 缺测值: 状态为9, 浮点列为nan (文件中为-999.9/-9999.9/-1.00e+05)
+ACE_STATUS_MISSING = 9
+# 写入列式存储的锁
+STORE_LOCK = threading.Lock()
+
+# ftp主机及文件夹 (文件名 yyyymmdd_ace_<datamode>.txt)
+ACE_HOST = 'ftp.swpc.noaa.gov'
+ACE_FOLDER = '/pub/lists/ace'
+# 同时下载的数据模式
+ACE_MODES = ('swepam_1m', 'mag_1m')
+# 计划下载的文件数不少于此值时获取一次文件夹列表, 否则逐个文件查询 (MLST)
+PLAN_LIST_MIN = 16
+
+# 实时跟踪: 轮询间隔 [s] 及内存环形缓冲区长度 [分钟]
+FOLLOW_INTERVAL = 20
+RING_SIZE = 1440
+
+##----------------------------------------------------------------------##
+# INFO: 解析ACE分钟数据文本
 ##----------------------------------------------------------------------##
-# INFO: ftp网站连接
+#   skip_bad为True时跳过数值无法解析的记录 (打印WARNING), 否则抛出
+#   ValueError.
 ##----------------------------------------------------------------------##
 # Inputs:
-#   host            - 主机名
-#   port            - 端口号
-#   ftpfoldpath     - ftp文件夹路径
+#   lines           - 文件文本行 (可迭代对象, str)
+#   datamode        - 数据模式 swepam_1m mag_1m
+#   skip_bad        - 是否跳过无法解析的记录
 # Outputs:
-#   ftp             - ftp
+#   minutes         - 每条记录距ACE_EPOCH的分钟数 [int64, (n,)]
+#   columns         - {列名: 数组 (n,)}
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/21,23; 07/11
+# date: 2026/10/18
 ##----------------------------------------------------------------------##
-def ftp_connect(host,port,ftpfoldpath):
-    ftp = FTP()
-    ftp.encoding = 'utf-8'
-    
+def parse_ace_lines(lines,datamode,skip_bad=False):
+    spec = ACE_COLUMNS[datamode]
+    ncol = max(each[1] for each in spec) + 1
+
+    rows = []
+    for line in lines:
+        fields = line.split()
+        # 跳过文件头 (':'或'#'开头) 及不完整的行
+        if len(fields) != ncol or not fields[0].isdigit():
+            continue
+        rows.append(fields)
     try:
-        # 登录FTP
-        ftp.connect(host, port)
-        ftp.login()
-        # 跳转至指定文件夹路径
-        ftp.cwd(ftpfoldpath)
-    except(socket.error, socket.gaierror):  # ftp 连接错误
-        print("ERROR: cannot connect [{}:{}]".format(host, port))
-        return None
-    except error_perm:  # 用户登录认证错误
-        print("ERROR: user Authentication failed ")
-        return None
-    
-    return ftp
+        data = np.array(rows, dtype=float).reshape(-1, ncol)
+    except ValueError:
+        if not skip_bad:
+            raise
+        # 逐条解析, 跳过无法解析的记录
+        data = np.array(drop_bad_rows(rows), dtype=float).reshape(-1, ncol)
+
+    # 分钟索引 (简化儒略日, 当天秒数)
+    minutes = (data[:,4].astype(np.int64) - ACE_EPOCH_MJD)*1440 + \
+        data[:,5].astype(np.int64)//60
+
+    columns = {}
+    for name, idx, dtype in spec:
+        values = data[:,idx]
+        if name == 'status':
+            columns[name] = values.astype(dtype)
+        else:
+            columns[name] = np.where(values <= -999, np.nan, values).astype(
+                dtype)
+
+    return minutes, columns
 
 ##----------------------------------------------------------------------##
-# INFO: 判断文件在ftp中是否存在
+# INFO: 逐条转换为数值, 跳过无法解析的记录
+##----------------------------------------------------------------------##
+def drop_bad_rows(rows):
+    good = []
+    for fields in rows:
+        try:
+            good.append([float(each) for each in fields])
+        except ValueError:
+            print('WARNING: 跳过无法解析的ACE记录: ' + ' '.join(fields))
+
+    return good
+
+##----------------------------------------------------------------------##
+# INFO: 写入列式存储 (按分钟索引原位写入, 存储较短时先补缺测值)
 ##----------------------------------------------------------------------##
 # Inputs:
-#   ftp_conn        - ftp
-#   filename        - 需判断的文件名
+#   storepath       - 存储文件夹路径
+#   datamode        - 数据模式 swepam_1m mag_1m
+#   minutes         - 分钟索引 [int64, (n,)]
+#   columns         - {列名: 数组 (n,)}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def write_ace_store(storepath,datamode,minutes,columns):
+    valid = minutes >= 0
+    if not valid.any():
+        return
+    minutes = minutes[valid]
+    size = int(minutes.max()) + 1
+
+    with STORE_LOCK:
+        if not os.path.exists(storepath):
+            os.makedirs(storepath)
+        for name, idx, dtype in ACE_COLUMNS[datamode]:
+            dtype = np.dtype(dtype)
+            filepath = os.path.join(storepath, name + '.bin')
+            fill = ACE_STATUS_MISSING if name == 'status' else np.nan
+            # 补齐长度
+            with open(filepath, 'ab') as f:
+                n = f.tell() // dtype.itemsize
+                if n < size:
+                    f.write(np.full(size - n, fill, dtype=dtype).tobytes())
+            # 原位写入
+            store = np.memmap(filepath, dtype=dtype, mode='r+')
+            store[minutes] = columns[name][valid]
+            store.flush()
+            del store
+
+##----------------------------------------------------------------------##
+# INFO: 由已下载的原始文件生成列式存储
+##----------------------------------------------------------------------##
+# Inputs:
+#   foldpath        - 数据模式文件夹 (包含yyyy/mm/原始文件)
+#   datamode        - 数据模式 swepam_1m mag_1m
 # Outputs:
-#   flag            - bool值 True/False 存在/不存在
+#   n               - 写入的文件数
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/21,23; 07/11
+# date: 2026/10/18
 ##----------------------------------------------------------------------##
-def is_ftp_file(ftp_conn, filename):
-    try:
-        if filename in ftp_conn.nlst(os.path.dirname(filename)):
-            return True
-        else:
-            return False
-    except error_perm:
-        return False
+def build_ace_store(foldpath,datamode):
+    storepath = os.path.join(foldpath,'store')
+    n = 0
+    for dirpath, dirnames, filenames in sorted(os.walk(foldpath)):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.endswith('_ace_{:s}.txt'.format(datamode)):
+                continue
+            with open(os.path.join(dirpath,filename), 'r') as f:
+                minutes, columns = parse_ace_lines(f, datamode)
+            write_ace_store(storepath,datamode,minutes,columns)
+            n += 1
+
+    return n
+
+##----------------------------------------------------------------------##
+# INFO: 列式存储不存在时由已下载的原始文件生成, 返回存储路径
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def check_store(foldpath,datamode):
+    storepath = os.path.join(foldpath,'store')
+    if not os.path.exists(storepath):
+        n = build_ace_store(foldpath,datamode)
+        if n > 0:
+            print('已由{:d}个原始文件生成列式存储: {:s}'.format(n,storepath))
+
+    return storepath
+
+##----------------------------------------------------------------------##
+# INFO: 读取指定时间范围的ACE数据 (列式存储)
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath        - 根目录
+#   datamode        - 数据模式 swepam_1m mag_1m
+#   stime           - 开始时间 [datetime]
+#   etime           - 结束时间 [datetime] (包含)
+#   names           - 读取的列名, None时为全部列
+# Outputs:
+#   epochs          - 每分钟的时刻 [datetime64[m], (n,)]
+#   columns         - {列名: 内存映射切片 (n,)}, 超出存储范围的部分不返回
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def read_ace(rootpath,datamode,stime,etime,names=None):
+    storepath = os.path.join(rootpath,datamode,'store')
+    spec = [each for each in ACE_COLUMNS[datamode]
+        if names is None or each[0] in names]
+
+    # 分钟索引范围 [i0, i1)
+    st = np.datetime64(stime,'s') - ACE_EPOCH.astype('datetime64[s]')
+    et = np.datetime64(etime,'s') - ACE_EPOCH.astype('datetime64[s]')
+    i0 = max(0, -(-int(st.astype(np.int64))//60))
+    i1 = max(i0, int(et.astype(np.int64))//60 + 1)
+
+    columns = {}
+    for name, idx, dtype in spec:
+        store = np.memmap(os.path.join(storepath, name + '.bin'),
+            dtype=np.dtype(dtype), mode='r')
+        i1 = min(i1, len(store))
+        columns[name] = store
+    i0 = min(i0, i1)
+
+    return ACE_EPOCH + np.arange(i0, i1), \
+        {name: store[i0:i1] for name, store in columns.items()}
 
 ##----------------------------------------------------------------------##
 # INFO: 下载ftp文件
 ##----------------------------------------------------------------------##
+#   storepath不为None时同时解析写入列式存储; keep_raw为False时不保存原始
+#   文件, 接收的数据块逐行解析后直接写入列式存储.
+##----------------------------------------------------------------------##
 # Inputs:
 #   ftp             - ftp
 #   filename        - 需下载的文件名
 #   savefilepath    - 本地保存文件名
+#   manifest        - 同步清单, None时总是下载
+#   datamode        - 数据模式 swepam_1m mag_1m (写入列式存储时需要)
+#   storepath       - 列式存储文件夹路径, None时不写入
+#   keep_raw        - 是否保存原始文件
+#   remote          - 已获取的远程文件属性, None时由文件夹列表获取
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/07/11
+# date: 2022/07/11; 2026/10/18
 ##----------------------------------------------------------------------##
-def ftp_savefile(ftp,filename,savefilepath):
-    # FTP: 文件名是否存在
-    if is_ftp_file(ftp,filename):
-        # 下载指定文件到指定文件
-        with open(savefilepath,'wb') as f:
-            ftp.retrbinary('RETR ' + filename, f.write, 1024)
-    else:
+def ftp_savefile(ftp,filename,savefilepath,manifest=None,datamode=None,
+    storepath=None,keep_raw=True,remote=None):
+    # FTP: 文件属性 (文件名不存在时为None)
+    if remote is None:
+        remote = ftp_stat(ftp,posixpath.join(ACE_FOLDER,filename))
+    if remote is None:
         print('FTP文件不存在: ' + filename)
+        return
+
+    # 远程文件无变化且本地文件完整 (不保存原始文件时只比较远程属性)
+    localpath = savefilepath if keep_raw else None
+    if manifest is not None and \
+        is_synced(manifest,filename,localpath,remote):
+        return
+
+    print("正在下载: " + filename)
+    if keep_raw:
+        # 下载指定文件到指定文件 (断点续传, 完成后重命名)
+        ftp_download(ftp,filename,savefilepath,remote)
+        if storepath is not None:
+            with open(savefilepath,'r') as f:
+                minutes, columns = parse_ace_lines(f,datamode)
+    else:
+        # 边接收边解析 (不缓存整个文件); ftp_iter_chunks接收完后校验大小
+        counter = {'size': 0}
+        chunks = ftp_iter_chunks(ftp,filename,remote.get('size'))
+        minutes, columns = parse_ace_lines(
+            iter_text_lines(count_chunks(chunks,counter)),datamode)
+        # 服务器未提供大小时记录接收的字节数
+        if remote.get('size') is None:
+            remote = dict(remote, size=counter['size'])
+
+    # 写入列式存储
+    if storepath is not None:
+        write_ace_store(storepath,datamode,minutes,columns)
+
+    # 记录同步信息
+    if manifest is not None:
+        update_manifest(manifest,filename,localpath,remote)
+
+##----------------------------------------------------------------------##
+# INFO: 统计数据块的总字节数 (计入counter['size'])
+##----------------------------------------------------------------------##
+def count_chunks(chunks,counter):
+    for chunk in chunks:
+        counter['size'] += len(chunk)
+        yield chunk
 
 ##----------------------------------------------------------------------##
 # INFO: 获取指定匹配规则的ftp文件名列表
@@ -92,19 +325,184 @@ def ftp_savefile(ftp,filename,savefilepath):
 #   filenames       - 满足匹配规则的文件名列表
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/07/11
+# date: 2022/07/11; 2026/10/18
 ##----------------------------------------------------------------------##
 def ftp_getfiles(ftp,regular_rules):
-    # 获取满足规则的所有文件信息
-    ftp_files = []
-    ftp.dir(regular_rules,ftp_files.append)
-
-    # 拆分字符串以提取文件名
-    filenames = []
-    for each in ftp_files:
-        filenames.append(each.split()[-1])
-    
-    return filenames
+    # 获取ACE文件夹列表 (与is_ftp_file共用缓存) 并按规则筛选
+    return ftp_globdir(ftp,regular_rules,ACE_FOLDER)
+
+##----------------------------------------------------------------------##
+# INFO: 生成本地保存路径 foldpath/yyyy/mm/filename (创建文件夹)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_savepath(foldpath,filename):
+    # 保存文件夹路径 yyyy/mm
+    savefoldpath = os.path.join(foldpath,filename[0:4],filename[4:6])
+    if not os.path.exists(savefoldpath):
+        os.makedirs(savefoldpath)
+
+    return os.path.join(savefoldpath,filename)
+
+##----------------------------------------------------------------------##
+# INFO: 筛选日期范围内的文件并生成本地保存路径
+##----------------------------------------------------------------------##
+# Inputs:
+#   filenames       - ftp文件名列表
+#   symd            - 开始日期 yyyymmdd
+#   eymd            - 结束日期 yyyymmdd
+#   foldpath        - 保存文件夹路径
+# Outputs:
+#   files           - [(ftp文件名, 本地保存路径), ...]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/07/11; 2026/10/18
+##----------------------------------------------------------------------##
+def get_savepaths(filenames,symd,eymd,foldpath):
+    files = []
+    for filename in filenames:
+        # 当前文件日期 yyyymmdd (不在日期范围内时跳过, 不依赖列表顺序)
+        if not filename[0:8].isdigit() or \
+            not symd <= int(filename[0:8]) <= eymd:
+            continue
+
+        # 保存文件路径 yyyy/mm/filename
+        files.append((filename,get_savepath(foldpath,filename)))
+
+    return files
+
+##----------------------------------------------------------------------##
+# INFO: 生成日期范围内各数据模式的文件名 (不获取ftp文件夹列表)
+##----------------------------------------------------------------------##
+# Inputs:
+#   symd            - 开始日期 yyyymmdd
+#   eymd            - 结束日期 yyyymmdd (包含)
+#   datamodes       - 数据模式列表
+# Outputs:
+#   plan            - [(yyyymmdd, {数据模式: 文件名}), ...]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def plan_files(symd,eymd,datamodes=ACE_MODES):
+    sdate = datetime.datetime.strptime(str(symd),'%Y%m%d')
+    edate = datetime.datetime.strptime(str(eymd),'%Y%m%d')
+
+    plan = []
+    for i in range((edate-sdate).days + 1):
+        ymd = (sdate + datetime.timedelta(days=i)).strftime('%Y%m%d')
+        plan.append((ymd, {datamode: '{:s}_ace_{:s}.txt'.format(ymd,datamode)
+            for datamode in datamodes}))
+
+    return plan
+
+##----------------------------------------------------------------------##
+# INFO: 查询计划下载的文件在ftp中的属性, 去掉不存在的文件
+##----------------------------------------------------------------------##
+#   文件数少于PLAN_LIST_MIN时逐个查询 (MLST), 否则获取一次文件夹列表
+#   (服务器只保留近期文件, 长日期范围的大部分文件不存在).
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp (当前文件夹为ACE_FOLDER)
+#   plan            - plan_files的结果
+# Outputs:
+#   found           - [(yyyymmdd, {数据模式: (文件名, 远程属性)}), ...]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def check_plan(ftp,plan):
+    nfile = sum(len(files) for ymd, files in plan)
+    stat = ftp_stat if nfile >= PLAN_LIST_MIN else ftp_mlst
+
+    found = []
+    for ymd, files in plan:
+        remotes = {}
+        for datamode, filename in files.items():
+            remote = stat(ftp,ACE_FOLDER + '/' + filename)
+            if remote is not None:
+                remotes[datamode] = (filename, remote)
+        if len(remotes) > 0:
+            found.append((ymd, remotes))
+
+    return found
+
+##----------------------------------------------------------------------##
+# INFO: 打开各数据模式的同步清单及列式存储
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath        - 根目录
+#   datamodes       - 数据模式列表
+# Outputs:
+#   targets         - {数据模式: {'foldpath','manifestpath','manifest',
+#                     'storepath'}}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def open_targets(rootpath,datamodes=ACE_MODES):
+    targets = {}
+    for datamode in datamodes:
+        foldpath = os.path.join(rootpath,datamode)
+        if not os.path.exists(foldpath):
+            os.makedirs(foldpath)
+        manifestpath = os.path.join(foldpath,'manifest.json')
+        targets[datamode] = {
+            'foldpath': foldpath,
+            'manifestpath': manifestpath,
+            'manifest': load_manifest(manifestpath),
+            'storepath': check_store(foldpath,datamode),
+        }
+
+    return targets
+
+def save_targets(targets):
+    for target in targets.values():
+        save_manifest(target['manifestpath'],target['manifest'])
+
+##----------------------------------------------------------------------##
+# INFO: 下载一天的各数据模式文件 (同一ftp连接)
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp
+#   remotes         - {数据模式: (文件名, 远程属性)} (check_plan)
+#   targets         - open_targets的结果
+#   keep_raw        - 是否保存原始文件
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def sync_day(ftp,remotes,targets,keep_raw=True):
+    for datamode, (filename, remote) in remotes.items():
+        target = targets[datamode]
+        ftp_savefile(ftp,filename,get_savepath(target['foldpath'],filename),
+            target['manifest'],datamode,target['storepath'],keep_raw,remote)
+
+##----------------------------------------------------------------------##
+# INFO: 下载日期范围内的ACE数据 (swepam及mag共用一个ftp连接)
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp (当前文件夹为ACE_FOLDER)
+#   rootpath        - 根目录 (各数据模式保存在rootpath/<datamode>)
+#   symd            - 开始日期 yyyymmdd
+#   eymd            - 结束日期 yyyymmdd (包含)
+#   datamodes       - 数据模式列表
+#   keep_raw        - 是否保存原始文件
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def download_range(ftp,rootpath,symd,eymd,datamodes=ACE_MODES,keep_raw=True):
+    targets = open_targets(rootpath,datamodes)
+
+    # 计划下载的文件中ftp上存在的文件
+    found = check_plan(ftp,plan_files(symd,eymd,datamodes))
+    for ymd, remotes in found:
+        sync_day(ftp,remotes,targets,keep_raw)
+
+    # 保存同步清单
+    save_targets(targets)
 
 ##----------------------------------------------------------------------##
 # INFO: 下载ftp文件
@@ -115,68 +513,314 @@ def ftp_getfiles(ftp,regular_rules):
 #   symd            - 开始日期 yyyymmdd
 #   eymd            - 结束日期 yyyymmdd
 #   foldpath        - 保存文件夹路径
+#   keep_raw        - 是否保存原始文件 (数据均写入foldpath/store列式存储)
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/07/11
+# date: 2022/07/11; 2026/10/18
 ##----------------------------------------------------------------------##
-def download_files(ftp,regular_rules,symd,eymd,foldpath):
+def download_files(ftp,regular_rules,symd,eymd,foldpath,keep_raw=True):
     # 获取满足条件的ftp文件名列表
     filenames = ftp_getfiles(ftp,regular_rules)
+
+    # 同步清单: 只下载远程有更新或本地不完整的文件
+    manifestpath = os.path.join(foldpath,'manifest.json')
+    manifest = load_manifest(manifestpath)
+
+    # 列式存储 (不存在时由已下载的原始文件生成)
+    datamode = regular_rules.split('_ace_')[-1][:-4]
+    storepath = check_store(foldpath,datamode)
     
     # 循环下载列表中的ftp文件
-    for i in range(len(filenames)):
-        # 当前文件日期 yyyymmdd
-        nymd = int(filenames[i][0:8])
-        # 小于开始日期时重新循环
-        if nymd<symd:
-            continue
-        # 大于结束日期时终止循环
-        if nymd>eymd:
-            break
-
-        # 当前文件年 yyyy
-        yyyy = filenames[i][0:4]
-        # 当前文件月 mm
-        mm = filenames[i][4:6]
-        # 保存文件夹路径 yyyy/mm
-        savefoldpath = os.path.join(foldpath,'{:s}/{:s}'.format(yyyy,mm))
-        if not os.path.exists(savefoldpath):
-            os.makedirs(savefoldpath)
-        
-        # 保存文件路径 yyyy/mm/filename
-        savefilepath = os.path.join(savefoldpath,filenames[i])
-
+    for filename,savefilepath in get_savepaths(filenames,symd,eymd,foldpath):
         # 下载文件
-        print("正在下载: " + filenames[i])
-        ftp_savefile(ftp,filenames[i],savefilepath)
+        ftp_savefile(ftp,filename,savefilepath,manifest,datamode,storepath,
+            keep_raw)
+
+    # 保存同步清单
+    save_manifest(manifestpath,manifest)
     
     # 断开服务器链接
     ftp.quit()
 
+##----------------------------------------------------------------------##
+# INFO: 数据集定义 (供fetch_engine与其他数据集并发下载)
+##----------------------------------------------------------------------##
+#   每天一个下载任务 (swepam及mag共用连接). 文件数较多时先由一个任务获取
+#   文件夹列表, 只为ftp上存在的日期生成下载任务.
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath        - 根目录
+#   symd            - 开始日期 yyyymmdd
+#   eymd            - 结束日期 yyyymmdd (包含)
+#   datamodes       - 数据模式列表
+#   keep_raw        - 是否保存原始文件
+# Outputs:
+#   dataset         - 数据集
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_dataset(rootpath,symd,eymd,datamodes=ACE_MODES,keep_raw=True):
+    targets = open_targets(rootpath,datamodes)
+    plan = plan_files(symd,eymd,datamodes)
+
+    # 下载一天的文件 (remotes为None时先逐个查询文件属性)
+    def saveday(ftp,ymd,files,remotes=None):
+        ftp.cwd(ACE_FOLDER)
+        if remotes is None:
+            found = check_plan(ftp,[(ymd,files)])
+            remotes = found[0][1] if len(found) > 0 else {}
+        sync_day(ftp,remotes,targets,keep_raw)
+
+    # 获取文件夹列表并为存在的日期生成下载任务
+    def listplan(ftp):
+        ftp.cwd(ACE_FOLDER)
+        return [make_task('ftp',ACE_HOST,saveday,ymd,None,remotes,
+            name='ACE ' + ymd) for ymd, remotes in check_plan(ftp,plan)]
+
+    if sum(len(files) for ymd, files in plan) >= PLAN_LIST_MIN:
+        tasks = [make_task('ftp',ACE_HOST,listplan,name='ACE 列表')]
+    else:
+        tasks = [make_task('ftp',ACE_HOST,saveday,ymd,files,
+            name='ACE ' + ymd) for ymd, files in plan]
+
+    return make_dataset('ACE', tasks, lambda: save_targets(targets))
+
+##----------------------------------------------------------------------##
+# INFO: 创建内存环形缓冲区 (保存最近ring_size分钟的记录)
+##----------------------------------------------------------------------##
+# Inputs:
+#   datamode        - 数据模式 swepam_1m mag_1m
+#   ring_size       - 缓冲区长度 [记录数]
+# Outputs:
+#   ring            - 环形缓冲区 {'datamode','size','count','last',
+#                     'minutes','columns','lock'}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ring_create(datamode,ring_size=RING_SIZE):
+    columns = {}
+    for name, idx, dtype in ACE_COLUMNS[datamode]:
+        fill = ACE_STATUS_MISSING if name == 'status' else np.nan
+        columns[name] = np.full(ring_size, fill, dtype=dtype)
+
+    return {'datamode': datamode, 'size': ring_size, 'count': 0, 'last': -1,
+        'minutes': np.full(ring_size, -1, dtype=np.int64),
+        'columns': columns, 'lock': threading.Lock()}
+
+##----------------------------------------------------------------------##
+# INFO: 向环形缓冲区追加记录 (只追加晚于最后一条记录的分钟)
+##----------------------------------------------------------------------##
+# Inputs:
+#   ring            - 环形缓冲区
+#   minutes         - 分钟索引 [int64, (n,)]
+#   columns         - {列名: 数组 (n,)}
+# Outputs:
+#   n               - 追加的记录数
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ring_append(ring,minutes,columns):
+    with ring['lock']:
+        new = minutes > ring['last']
+        n = int(new.sum())
+        if n == 0:
+            return 0
+        # 超过缓冲区长度时只保留最后ring['size']条
+        k = min(n, ring['size'])
+        idx = (ring['count'] + n - k + np.arange(k)) % ring['size']
+        ring['minutes'][idx] = minutes[new][-k:]
+        for name, values in ring['columns'].items():
+            values[idx] = columns[name][new][-k:]
+        ring['count'] += n
+        ring['last'] = int(minutes[new].max())
+
+    return n
+
+##----------------------------------------------------------------------##
+# INFO: 读取环形缓冲区中最近的记录 (按时间顺序)
+##----------------------------------------------------------------------##
+# Inputs:
+#   ring            - 环形缓冲区
+#   n               - 读取的记录数, None时为全部
+# Outputs:
+#   epochs          - 每条记录的时刻 [datetime64[m], (n,)]
+#   columns         - {列名: 数组 (n,)} (副本)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def ring_read(ring,n=None):
+    with ring['lock']:
+        k = min(ring['count'], ring['size'])
+        if n is not None:
+            k = min(k, n)
+        idx = (ring['count'] - k + np.arange(k)) % ring['size']
+        return ACE_EPOCH + ring['minutes'][idx], \
+            {name: values[idx] for name, values in ring['columns'].items()}
+
+##----------------------------------------------------------------------##
+# INFO: 实时跟踪的文件状态 (当天文件, 已接收位置)
+##----------------------------------------------------------------------##
+#   保存原始文件时从本地文件末尾继续, 否则从头接收当天文件.
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def tail_state(target,datamode,ymd,keep_raw=True):
+    filename = '{:s}_ace_{:s}.txt'.format(ymd,datamode)
+    savepath = get_savepath(target['foldpath'],filename)
+    offset = 0
+    if keep_raw and os.path.exists(savepath):
+        offset = os.path.getsize(savepath)
+
+    return {'ymd': ymd, 'filename': filename, 'savepath': savepath,
+        'offset': offset}
+
+##----------------------------------------------------------------------##
+# INFO: 接收ftp文件新增的部分 (REST从已接收位置开始), 解析并写入
+##----------------------------------------------------------------------##
+#   只处理到最后一个换行符, 不完整的行下次再接收; 远程文件变短 (被重写)
+#   时从头接收.
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp             - ftp (当前文件夹为ACE_FOLDER)
+#   state           - tail_state的结果, offset在接收后更新
+#   target          - open_targets中对应数据模式的项
+#   datamode        - 数据模式 swepam_1m mag_1m
+#   ring            - 环形缓冲区, None时不写入
+#   keep_raw        - 是否追加到原始文件
+# Outputs:
+#   minutes         - 新记录的分钟索引 [int64, (n,)]
+#   columns         - {列名: 数组 (n,)}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def tail_file(ftp,state,target,datamode,ring=None,keep_raw=True):
+    remote = ftp_mlst(ftp,state['filename'])
+    if remote is None or int(remote.get('size',0)) == state['offset']:
+        return None, None
+    if int(remote.get('size',0)) < state['offset']:
+        state['offset'] = 0
+
+    # 新增的部分
+    buf = io.BytesIO()
+    ftp_retrieve(ftp,state['filename'],buf,rest=state['offset'] or None)
+    data = buf.getvalue()
+    data = data[:data.rfind(b'\n')+1]
+    if len(data) == 0:
+        return None, None
+
+    if keep_raw:
+        with open(state['savepath'], 'r+b' if state['offset'] > 0 else 'wb') \
+            as f:
+            f.seek(state['offset'])
+            f.write(data)
+            f.truncate()
+    state['offset'] += len(data)
+
+    # 实时文件可能含不完整或损坏的记录, 跳过而不中断跟踪
+    lines = data.decode('ascii', errors='replace').splitlines()
+    minutes, columns = parse_ace_lines(lines,datamode,skip_bad=True)
+    write_ace_store(target['storepath'],datamode,minutes,columns)
+    if ring is not None:
+        ring_append(ring,minutes,columns)
+
+    # 已接收完整个文件时记录同步信息
+    if state['offset'] == int(remote.get('size',0)):
+        update_manifest(target['manifest'],state['filename'],
+            state['savepath'] if keep_raw else None,remote)
+
+    return minutes, columns
+
+##----------------------------------------------------------------------##
+# INFO: 实时跟踪当天的ACE文件 (轮询新增数据, 写入环形缓冲区及列式存储)
+##----------------------------------------------------------------------##
+#   每interval秒查询一次当天文件的大小, 只接收新增的部分. 日期变化时先
+#   接收完前一天的文件再切换. 连接断开时重新连接.
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath        - 根目录
+#   datamodes       - 数据模式列表
+#   interval        - 轮询间隔 [s]
+#   ring_size       - 环形缓冲区长度 [分钟]
+#   keep_raw        - 是否保存原始文件
+#   callback        - 有新数据时调用 callback(datamode,ring,minutes,columns)
+#   stop            - threading.Event, 设置后结束跟踪; None时一直运行
+#   port            - ftp端口号
+# Outputs:
+#   rings           - {数据模式: 环形缓冲区}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def follow_ace(rootpath,datamodes=ACE_MODES,interval=FOLLOW_INTERVAL,
+    ring_size=RING_SIZE,keep_raw=True,callback=None,stop=None,port=21):
+    stop = threading.Event() if stop is None else stop
+    targets = open_targets(rootpath,datamodes)
+    rings = {datamode: ring_create(datamode,ring_size) for datamode in datamodes}
+
+    ymd = datetime.datetime.utcnow().strftime('%Y%m%d')
+    states = {datamode: tail_state(targets[datamode],datamode,ymd,keep_raw)
+        for datamode in datamodes}
+
+    ftp = None
+    while not stop.is_set():
+        try:
+            if ftp is None:
+                ftp = ftp_open(ACE_HOST,port)
+                ftp.cwd(ACE_FOLDER)
+            today = datetime.datetime.utcnow().strftime('%Y%m%d')
+            for datamode in datamodes:
+                while True:
+                    minutes, columns = tail_file(ftp,states[datamode],
+                        targets[datamode],datamode,rings[datamode],keep_raw)
+                    if minutes is not None and callback is not None:
+                        callback(datamode,rings[datamode],minutes,columns)
+                    # 日期变化: 前一天的文件已接收完, 切换到当天文件
+                    if states[datamode]['ymd'] == today:
+                        break
+                    states[datamode] = tail_state(targets[datamode],
+                        datamode,today,keep_raw)
+            save_targets(targets)
+        except FTP_CONN_ERRORS as e:
+            print('WARNING: ACE实时跟踪连接断开, 重新连接: {}'.format(e))
+            try:
+                ftp.close()
+            except Exception:
+                pass
+            ftp = None
+        except ValueError as e:
+            # 数据问题: 保持连接, 下次轮询继续
+            print('WARNING: ACE实时跟踪数据解析失败: {}'.format(e))
+        stop.wait(interval)
+
+    if ftp is not None:
+        ftp_close(ftp)
+    save_targets(targets)
+
+    return rings
+
 ##----------------------------------------------------------------------##
 if __name__=='__main__':
     # 根目录
     rootpath = '/Volumes/Washy1T/SpacePhysicsData/ACE'
     # 数据模式 swepam_1m mag_1m
-    datamode = 'mag_1m'
-    # 文件名匹配规则
-    regular_rules = '*_ace_{:s}.txt'.format(datamode)
+    datamodes = ACE_MODES
     # 开始日期
     symd = 20180101
     # 结束日期
     eymd = 20190101
 
-    # 文件夹路径
-    foldpath = os.path.join(rootpath,datamode)
-    if not os.path.exists(foldpath):
-        os.makedirs(foldpath)
-    # 主机名
-    host = 'ftp.swpc.noaa.gov'
     # 端口号
     port = 21
-    # 文件夹路径
-    ftpfoldpath = '/pub/lists/ace'
     # 连接ftp服务器
-    ftp = ftp_connect(host,port,ftpfoldpath)
-    # 下载文件
-    download_files(ftp,regular_rules,symd,eymd,foldpath)
+    ftp = ftp_open(ACE_HOST,port)
+    ftp.cwd(ACE_FOLDER)
+    # 下载文件 (各数据模式共用连接)
+    download_range(ftp,rootpath,symd,eymd,datamodes)
+    # 断开服务器链接
+    ftp_close(ftp)
@@ -2,32 +2,89 @@
 INFO: 爬取 http://wdc.kugi.kyoto-u.ac.jp/wdc/Sec3.html 网站 Dst 数据
 date: 2022-03-19,22,23 Washy [CUG washy21@163.com]
 func:
+    get_Dst_url         - 获取指定年月的Dst数据url
+    get_Dst_page        - 请求Dst数据网页 (可带条件请求头)
+    get_pre_text        - 提取网页中<pre>节点的文本
+    get_Dst_rows        - 提取网页中每一天的数据行
+    parse_Dst_page      - 从网页内容中提取Dst数据
+    decode_Dst_fields   - 解析Dst定宽(4字符)数据字段
+    parse_Dst_array     - 从网页内容中解析逐小时Dst数组
+    read_Dst            - 读取已保存的Dst数据文件为逐小时数组
+    get_Dst_series      - 将逐小时数组转换为时间序列
     get_Dst_month       - 获取指定url的Dst数据
+    format_Dst          - 生成Dst数据文件内容
     save_Dst            - 存储Dst数据到指定路径
+    write_Dst_archive   - 将一个月的Dst写入逐小时存档
+    build_Dst_archive   - 由已保存的数据文件生成逐小时存档
+    get_dst             - 读取指定时间范围的Dst (存档的内存映射视图)
+    sync_Dst_month      - 同步指定年月的Dst数据
+    is_month_open       - 判断月份是否需检查网页更新
+    get_months          - 获取需同步的年月
     download_Dst_all    - 下载所有的Dst数据
+    get_dataset         - 数据集定义 (供fetch_engine使用)
 '''
 
 import os
+import re
 import sys 
-import time
+import html
+import calendar
 import requests
 import datetime
+import threading
+import numpy as np
 
-from bs4 import BeautifulSoup
+from http_utils import rate_limit
+
+from fetch_engine import make_task
+from fetch_engine import make_dataset
+from fetch_engine import fetch_datasets
+
+from sync_manifest import is_synced
+from sync_manifest import http_facts
+from sync_manifest import load_manifest
+from sync_manifest import save_manifest
+from sync_manifest import update_manifest
+from sync_manifest import same_content
+from sync_manifest import conditional_headers
+
+# 缺测值 (网页中的9999及实时数据中尚未到达的小时)
+DST_MISSING = 9999
+# 网页数据行宽度: 日(2) 空格 8个小时 空格 8个小时 空格 8个小时 (每个4字符)
+DST_ROW_WIDTH = 101
+# 网页数据行中24个小时字段的起始列
+DST_ROW_COLS = np.array([3 + 33*(i//8) + 4*(i%8) for i in range(24)])
+
+# 逐小时存档: 根目录下的单个int16 (小端) 文件, 第i个值为DST_EPOCH后第i个
+# 小时 (该小时开始时刻) 的Dst, 没有数据的小时为DST_MISSING
+DST_ARCHIVE = 'dst_hourly.i2'
+DST_EPOCH = np.datetime64('1957-01-01T00', 'h')
+DST_DTYPE = np.dtype('<i2')
+# 多线程同步时写存档的锁
+ARCHIVE_LOCK = threading.Lock()
+# 数据网站主机
+DST_HOST = 'wdc.kugi.kyoto-u.ac.jp'
+# 月份结束后数据稳定所需的时间 (月末最后几小时的数据之后才发布或修订)
+DST_SETTLE = datetime.timedelta(days=2)
+
+# 伪装浏览器请求头
+UserAgent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) ' + \
+    'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/99.0.4844.' + \
+    '51 Safari/537.36'
 
 ##----------------------------------------------------------------------##
-# INFO: 爬取指定年月的Dst指数
+# INFO: 获取指定年月的Dst数据url
 ##----------------------------------------------------------------------##
 # Inputs:
 #   year        - 年 [int]
 #   month       - 月 [int]
 # Outputs:
-#   data        - 该月份下所有的Dst数据 [list]
+#   url         - 该月份Dst数据网页 [str]
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/19,22,23
+# date: 2022/03/19,22,23; 2026/10/18
 ##----------------------------------------------------------------------##
-def get_Dst_month(year, month):
+def get_Dst_url(year, month):
     # 判断year month属于哪个文件夹
     if year>=1957 and year<=2014:
         dst_version = 'dst_final'
@@ -41,20 +98,270 @@ def get_Dst_month(year, month):
         sys.exit()
 
     # 当前年份月份对应的url
-    url = "http://wdc.kugi.kyoto-u.ac.jp/" + dst_version + \
+    return "http://" + DST_HOST + "/" + dst_version + \
         "/{:d}{:02d}/index.html".format(year, month)
+
+##----------------------------------------------------------------------##
+# INFO: 请求Dst数据网页
+##----------------------------------------------------------------------##
+# Inputs:
+#   url         - 数据网页url [str]
+#   session     - requests会话, None时单独请求
+#   headers     - 附加请求头 (如If-None-Match/If-Modified-Since)
+# Outputs:
+#   res         - 响应 (条件请求且网页无更新时status_code为304)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_Dst_page(url, session=None, headers=None):
+    headers = dict(headers or {}, **{'user-agent': UserAgent})
+
+    # 请求前按主机限速
+    rate_limit(url)
+    get = requests.get if session is None else session.get
+    res = get(url, headers=headers)
+    if res.status_code != 304:
+        res.raise_for_status()
+
+    return res
+
+##----------------------------------------------------------------------##
+# INFO: 提取网页中第一个<pre>节点的文本 (不建立完整的HTML树)
+##----------------------------------------------------------------------##
+# Inputs:
+#   page        - 网页内容 [str]
+# Outputs:
+#   text        - <pre>节点文本 (去除标签并转换字符实体) [str]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_pre_text(page):
+    lower = page.lower()
+    start = lower.find('<pre')
+    if start < 0:
+        raise ValueError('网页中没有<pre>节点')
+    start = lower.find('>', start) + 1
+    end = lower.find('</pre', start)
+    if end < 0:
+        end = len(page)
+
+    return html.unescape(re.sub(r'<[^>]*>', '', page[start:end]))
+
+##----------------------------------------------------------------------##
+# INFO: 提取网页中每一天的数据行
+##----------------------------------------------------------------------##
+#   数据行位于"DAY"行之后; 没有"DAY"行时按原方式从第410个字符起每101个
+#   字符为一行.
+##----------------------------------------------------------------------##
+# Inputs:
+#   page        - 网页内容 [str]
+# Outputs:
+#   rows        - 数据行, 均补齐为101字符 [list of str]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_Dst_rows(page):
+    text = get_pre_text(page)
+    lines = text.split('\n')
+
+    for i, line in enumerate(lines):
+        if line.strip().upper() == 'DAY':
+            rows = [each for each in lines[i+1:] if each.strip()]
+            break
+    else:
+        data = text[410:].replace('\n', '')
+        rows = [data[i:i+DST_ROW_WIDTH] for i in range(0, len(data),
+            DST_ROW_WIDTH)]
+
+    return [each[:DST_ROW_WIDTH].ljust(DST_ROW_WIDTH) for each in rows]
+
+##----------------------------------------------------------------------##
+# INFO: 从网页内容中提取Dst数据
+##----------------------------------------------------------------------##
+# Inputs:
+#   page        - 网页内容 [str]
+# Outputs:
+#   data        - 该月份下所有的Dst数据 (每天101个字符) [str]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/19,22,23; 2026/10/18
+##----------------------------------------------------------------------##
+def parse_Dst_page(page):
+    return ''.join(get_Dst_rows(page))
+
+##----------------------------------------------------------------------##
+# INFO: 解析Dst定宽(4字符)数据字段
+##----------------------------------------------------------------------##
+# Inputs:
+#   fields      - 字段字符数组 [uint8, (..., 4)]
+# Outputs:
+#   values      - 字段对应的整数, 空白及9999为DST_MISSING [int16, (...)]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def decode_Dst_fields(fields):
+    # 数字字符及负号
+    isdigit = (fields>=48) & (fields<=57)
+    isneg = (fields==45).any(axis=-1)
+
+    # 右对齐字段按位加权 (空格记为0)
+    digits = np.where(isdigit, fields.astype(np.int32) - 48, 0)
+    values = digits @ np.array([1000, 100, 10, 1], dtype=np.int32)
+    values[isneg] *= -1
+
+    # 缺测: 空白字段或9999
+    values[~isdigit.any(axis=-1) | (values == DST_MISSING)] = DST_MISSING
+
+    return values.astype(np.int16)
+
+##----------------------------------------------------------------------##
+# INFO: 从网页内容中解析逐小时Dst数组
+##----------------------------------------------------------------------##
+# Inputs:
+#   page        - 网页内容 [str]
+#   year        - 年 [int]
+#   month       - 月 [int]
+# Outputs:
+#   dst         - 每天24小时的Dst, 行为当月第1天至最后一天, 网页中没有的
+#                 日期与小时为DST_MISSING [int16, (days,24)] [nT]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def parse_Dst_array(page, year, month):
+    ndays = calendar.monthrange(year, month)[1]
+    dst = np.full((ndays, 24), DST_MISSING, dtype=np.int16)
+
+    rows = get_Dst_rows(page)
+    if len(rows) == 0:
+        return dst
+
+    # 所有数据行转为字符数组 (rows,101)
+    chars = np.frombuffer(''.join(rows).encode('ascii', 'replace'),
+        dtype=np.uint8).reshape(len(rows), DST_ROW_WIDTH)
+    # 日期及24个小时字段
+    days = decode_Dst_fields(np.concatenate([np.full((len(rows), 2), 32,
+        np.uint8), chars[:, :2]], axis=-1))
+    values = decode_Dst_fields(chars[:, DST_ROW_COLS[:, None] + np.arange(4)])
+
+    # 按日期填入 (跳过无效日期)
+    valid = (days >= 1) & (days <= ndays)
+    dst[days[valid] - 1] = values[valid]
+
+    return dst
+
+##----------------------------------------------------------------------##
+# INFO: 读取已保存的Dst数据文件 (save_Dst格式) 为逐小时数组
+##----------------------------------------------------------------------##
+# Inputs:
+#   filepath    - 数据文件路径, 文件名为yyyymm.txt [str]
+# Outputs:
+#   dst         - 每天24小时的Dst [int16, (days,24)] [nT]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def read_Dst(filepath):
+    name = os.path.basename(filepath)
+    year, month = int(name[:4]), int(name[4:6])
+    ndays = calendar.monthrange(year, month)[1]
+    dst = np.full((ndays, 24), DST_MISSING, dtype=np.int16)
+
+    # 跳过3行文件头, 每行25个'%4s '字段 (日期及24个小时)
+    with open(filepath, 'rb') as f:
+        rows = f.read().split(b'\n')[3:]
+    rows = [each[:125].ljust(125) for each in rows if each.strip()]
+    if len(rows) == 0:
+        return dst
+
+    chars = np.frombuffer(b''.join(rows), dtype=np.uint8).reshape(
+        len(rows), 25, 5)[..., :4]
+    days = decode_Dst_fields(chars[:, 0])
+    values = decode_Dst_fields(chars[:, 1:])
+
+    valid = (days >= 1) & (days <= ndays)
+    dst[days[valid] - 1] = values[valid]
+
+    return dst
+
+##----------------------------------------------------------------------##
+# INFO: 将逐小时数组转换为时间序列
+##----------------------------------------------------------------------##
+#   Dst第k个小时 (k=1..24) 为世界时k-1至k时的值, 时间取该小时的开始时刻.
+##----------------------------------------------------------------------##
+# Inputs:
+#   year        - 年 [int]
+#   month       - 月 [int]
+#   dst         - 每天24小时的Dst [int16, (days,24)]
+# Outputs:
+#   epochs      - 每个小时的开始时刻 [datetime64[h], (days*24,)]
+#   values      - Dst [int16, (days*24,)], 缺测为DST_MISSING
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_Dst_series(year, month, dst):
+    epochs = np.datetime64('{:04d}-{:02d}-01T00'.format(year, month), 'h') + \
+        np.arange(dst.size)
+
+    return epochs, dst.reshape(-1)
+
+##----------------------------------------------------------------------##
+# INFO: 爬取指定年月的Dst指数
+##----------------------------------------------------------------------##
+# Inputs:
+#   year        - 年 [int]
+#   month       - 月 [int]
+#   session     - requests会话, None时单独请求
+# Outputs:
+#   data        - 该月份下所有的Dst数据 [str]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/19,22,23; 2026/10/18
+##----------------------------------------------------------------------##
+def get_Dst_month(year, month, session=None):
+    # 当前年份月份对应的url
+    url = get_Dst_url(year, month)
     
-    # 伪装浏览器请求头
-    UserAgent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) ' + \
-        'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/99.0.4844.' + \
-        '51 Safari/537.36'
     # 获取网页内容
-    res = requests.get(url, headers={'user-agent': UserAgent})
-    # 将网页内容转成bs4 soup格式
-    soup = BeautifulSoup(res.text, 'html.parser')
-    
-    # 获取pre节点的文本信息并去除换行符 (410字符之后为Dst数据)
-    return soup.pre.get_text()[410:].replace('\n', '')
+    return parse_Dst_page(get_Dst_page(url, session).text)
+
+##----------------------------------------------------------------------##
+# INFO: 生成Dst数据文件内容
+##----------------------------------------------------------------------##
+# Inputs:
+#   data        - 指定年月的Dst数据 [str]
+# Outputs:
+#   text        - 文件内容 [str]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/19; 2026/10/18
+##----------------------------------------------------------------------##
+def format_Dst(data):
+    # 文件头说明
+    lines = ["        unit=nT                                  " + \
+        "                                                     " + \
+        "                    UT\n",
+        "        1    2    3    4    5    6    7    8    9" + \
+        "   10   11   12   13   14   15   16   17   18   19   " + \
+        "20   21   22   23   24\n",
+        "Days\n"]
+    # 循环存储每一天24h的数据
+    for idx in range(len(data)//101):
+        # 获取一天的数据
+        ddata = data[idx*101:(idx+1)*101]
+        # 构造每4个字符一个数据的格式
+        ddata = '  ' + ddata[:2] + ddata[3:35] + ddata[36:68] + \
+            ddata[69:]
+        
+        lines.append(''.join('%4s ' % ddata[i*4:(i+1)*4] for i in range(25)))
+        lines.append('\n')
+
+    return ''.join(lines)
 
 ##----------------------------------------------------------------------##
 # INFO: 保存Dst数据到指定文件
@@ -62,90 +369,285 @@ def get_Dst_month(year, month):
 # Inputs:
 #   filepath    - 指定文件的绝对路径 [str]
 #   data        - 指定年月的Dst数据 [str]
+#   text        - 已生成的文件内容 [str], None时由data生成
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/19
-##----------------------------------------------------------------------##
-def save_Dst(filepath, data):
-    with open(filepath, 'w') as f:
-        # 文件头说明
-        f.write("        unit=nT                                  " + \
-            "                                                     " + \
-            "                    UT\n")
-        f.write("        1    2    3    4    5    6    7    8    9" + \
-            "   10   11   12   13   14   15   16   17   18   19   " + \
-            "20   21   22   23   24\n")
-        f.write("Days\n")
-        # 循环存储每一天24h的数据
-        for idx in range(len(data)//101):
-            # 获取一天的数据
-            ddata = data[idx*101:(idx+1)*101]
-            # 构造每4个字符一个数据的格式
-            ddata = '  ' + ddata[:2] + ddata[3:35] + ddata[36:68] + \
-                ddata[69:]
-            
-            for i  in range(25):
-                f.write('%4s ' % ddata[i*4:(i+1)*4])
-            
-            f.write('\n')
+# date: 2022/03/19; 2026/10/18
+##----------------------------------------------------------------------##
+def save_Dst(filepath, data, text=None):
+    if text is None:
+        text = format_Dst(data)
+
+    # 先写临时文件, 完成后重命名 (按字节写入, 与清单中的sha1一致)
+    with open(filepath + '.part', 'wb') as f:
+        f.write(text.encode())
+
+    os.replace(filepath + '.part', filepath)
 
 ##----------------------------------------------------------------------##
-# INFO: 下载所有的Dst数据到指定文件夹
+# INFO: 将一个月的Dst写入逐小时存档 (原位覆盖, 存档较短时在末尾追加)
 ##----------------------------------------------------------------------##
 # Inputs:
 #   rootpath    - 根目录 [str]
+#   year        - 年 [int]
+#   month       - 月 [int]
+#   dst         - 每天24小时的Dst [int16, (days,24)]
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/22,23
+# date: 2026/10/18
 ##----------------------------------------------------------------------##
-def download_Dst_all(rootpath):
-    # 获取当前时间
-    date = datetime.datetime.utcnow()
-    # 下载所有的历史数据 1957-?
-    for year in range(2018, date.year):
-        # 存储文件夹
-        foldpath = os.path.join(rootpath, "%d"%year)
-        # 创建文件夹
-        if not os.path.exists(foldpath):
-            os.makedirs(foldpath)
-        
-        # 循环月份
-        for month in range(1,13):
-            # 生成文件名
-            filename = "{:d}{:02d}.txt".format(year,month)
-            # 生成文件绝对路径
-            filepath = os.path.join(foldpath, filename)
-            # 文件已存在则跳过
-            if os.path.exists(filepath):
-                print("文件已存在: " + filename)
+def write_Dst_archive(rootpath, year, month, dst):
+    archivepath = os.path.join(rootpath, DST_ARCHIVE)
+    # 该月第一个小时的索引
+    start = int((np.datetime64('{:04d}-{:02d}'.format(year, month), 'h') - \
+        DST_EPOCH).astype(np.int64))
+    if start < 0:
+        raise ValueError('Dst存档从{}开始'.format(DST_EPOCH))
+
+    with ARCHIVE_LOCK:
+        mode = 'r+b' if os.path.exists(archivepath) else 'w+b'
+        with open(archivepath, mode) as f:
+            # 存档末尾至该月之间补缺测值
+            size = f.seek(0, 2) // DST_DTYPE.itemsize
+            if size < start:
+                f.write(np.full(start - size, DST_MISSING,
+                    dtype=DST_DTYPE).tobytes())
+            f.seek(start * DST_DTYPE.itemsize)
+            f.write(np.ascontiguousarray(dst, dtype=DST_DTYPE).tobytes())
+
+##----------------------------------------------------------------------##
+# INFO: 由已保存的数据文件 (rootpath/yyyy/yyyymm.txt) 生成逐小时存档
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录 [str]
+# Outputs:
+#   n           - 写入的月份数
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def build_Dst_archive(rootpath):
+    n = 0
+    for year in sorted(os.listdir(rootpath)):
+        foldpath = os.path.join(rootpath, year)
+        if not (year.isdigit() and os.path.isdir(foldpath)):
+            continue
+        for filename in sorted(os.listdir(foldpath)):
+            if re.fullmatch(r'\d{6}\.txt', filename) is None:
                 continue
-            # 提示信息
-            print("正在下载: " + filename)
-            time.sleep(1)
-            # 获取数据
-            data = get_Dst_month(year, month)
-            # 存储数据
-            save_Dst(filepath, data)
-    
+            write_Dst_archive(rootpath, int(filename[:4]), int(filename[4:6]),
+                read_Dst(os.path.join(foldpath, filename)))
+            n += 1
+
+    return n
+
+##----------------------------------------------------------------------##
+# INFO: 读取指定时间范围的Dst
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录 [str]
+#   stime       - 开始时间 [datetime]
+#   etime       - 结束时间 [datetime] (包含)
+# Outputs:
+#   epochs      - 每个小时的开始时刻 [datetime64[h], (n,)]
+#   dst         - Dst [int16, (n,)], 存档的只读内存映射视图 (不复制),
+#                 缺测为DST_MISSING; 超出存档范围的部分不返回
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_dst(rootpath, stime, etime):
+    archivepath = os.path.join(rootpath, DST_ARCHIVE)
+    size = os.path.getsize(archivepath) // DST_DTYPE.itemsize
+
+    # 索引范围 [i0, i1) (开始时间向上取整到小时)
+    st = np.datetime64(stime, 's') - DST_EPOCH.astype('datetime64[s]')
+    et = np.datetime64(etime, 's') - DST_EPOCH.astype('datetime64[s]')
+    i0 = min(max(0, -(-int(st.astype(np.int64)) // 3600)), size)
+    i1 = min(max(0, int(et.astype(np.int64)) // 3600 + 1), size)
+    i1 = max(i0, i1)
+
+    epochs = DST_EPOCH + np.arange(i0, i1)
+    if size == 0:
+        return epochs, np.zeros(0, dtype=DST_DTYPE)
+
+    return epochs, np.memmap(archivepath, dtype=DST_DTYPE, mode='r')[i0:i1]
+
+##----------------------------------------------------------------------##
+# INFO: 同步指定年月的Dst数据
+##----------------------------------------------------------------------##
+# Inputs:
+#   session     - requests会话, None时单独请求
+#   rootpath    - 根目录 [str]
+#   year        - 年 [int]
+#   month       - 月 [int]
+#   manifest    - 同步清单
+#   check_remote- 是否检查网页更新 (已稳定的月份为False, 不访问网络)
+# Outputs:
+#   flag        - True/False 已下载/无需下载
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/22,23; 2026/10/18
+##----------------------------------------------------------------------##
+def sync_Dst_month(session, rootpath, year, month, manifest, check_remote):
     # 存储文件夹
-    foldpath = os.path.join(rootpath, "%d"%date.year)
+    foldpath = os.path.join(rootpath, "%d"%year)
     # 创建文件夹
     if not os.path.exists(foldpath):
-        os.makedirs(foldpath)
-
-    # 下载本年数据
-    for month in range(1,date.month+1):
-        # 生成文件名
-        filename = "{:d}{:02d}.txt".format(date.year,month)
-        # 生成文件绝对路径
-        filepath = os.path.join(foldpath, filename)
-        # 提示信息
-        print("正在下载: " + filename)
-        time.sleep(1)
-        # 获取数据
-        data = get_Dst_month(date.year, month)
-        # 存储数据
-        save_Dst(filepath, data)
+        os.makedirs(foldpath, exist_ok=True)
+
+    # 生成文件名
+    filename = "{:d}{:02d}.txt".format(year,month)
+    # 生成文件绝对路径
+    filepath = os.path.join(foldpath, filename)
+    # 数据url
+    url = get_Dst_url(year, month)
+
+    if not check_remote:
+        # 已稳定的月份: 已完整下载则跳过, 不访问网络
+        if is_synced(manifest, url, filepath):
+            print("文件已存在: " + filename)
+            return False
+        headers = None
+    else:
+        # 未稳定的月份: 带上次记录的ETag/Last-Modified条件请求
+        headers = conditional_headers(manifest, url, filepath)
+
+    # 获取网页 (网页无更新时服务器返回304, 不含内容)
+    res = get_Dst_page(url, session, headers)
+    if res.status_code == 304:
+        print("文件无更新: " + filename)
+        # 记录本次检查时间 (月份稳定后检查过一次即不再检查)
+        update_manifest(manifest, url, filepath, manifest[url]['remote'])
+        return False
+    remote = http_facts(res.headers)
+
+    # 生成文件内容, 与已有文件相同时不重写 (只更新清单中的远程属性)
+    text = format_Dst(parse_Dst_page(res.text))
+    if same_content(manifest, url, filepath, text.encode()):
+        print("文件无变化: " + filename)
+        update_manifest(manifest, url, filepath, remote)
+        return False
+
+    # 提示信息
+    print("正在下载: " + filename)
+    # 存储数据
+    save_Dst(filepath, None, text)
+    # 更新逐小时存档
+    write_Dst_archive(rootpath, year, month,
+        parse_Dst_array(res.text, year, month))
+    # 记录同步信息
+    update_manifest(manifest, url, filepath, remote)
+
+    return True
+
+##----------------------------------------------------------------------##
+# INFO: 判断月份是否需检查网页更新
+##----------------------------------------------------------------------##
+#   月份结束并经过DST_SETTLE后数据不再变化; 最后一次下载 (或检查) 在此
+#   之前时需再检查一次, 之后不再访问网络.
+##----------------------------------------------------------------------##
+# Inputs:
+#   manifest    - 同步清单, None时只按当前时间判断
+#   year        - 年 [int]
+#   month       - 月 [int]
+#   now         - 当前世界时 [datetime]
+# Outputs:
+#   flag        - True/False 需检查/已稳定
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def is_month_open(manifest, year, month, now):
+    # 下个月的第一天 + 稳定时间
+    closetime = datetime.datetime(year + month//12, month%12 + 1, 1) + \
+        DST_SETTLE
+    if now < closetime:
+        return True
+
+    # 未下载的月份由sync_Dst_month直接下载
+    entry = (manifest or {}).get(get_Dst_url(year, month))
+    if entry is None:
+        return False
+    return datetime.datetime.strptime(entry['time'],
+        '%Y-%m-%dT%H:%M:%S') < closetime
+
+##----------------------------------------------------------------------##
+# INFO: 获取需同步的年月 (开始年份至当前月份)
+##----------------------------------------------------------------------##
+# Inputs:
+#   syear       - 开始年份 (最早1957)
+#   manifest    - 同步清单, 见is_month_open
+# Outputs:
+#   months      - [(year, month, 是否检查网页更新), ...]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_months(syear=2018, manifest=None):
+    # 获取当前时间
+    date = datetime.datetime.utcnow()
+
+    months = []
+    # 下载所有的历史数据 1957-?
+    for year in range(syear, date.year+1):
+        # 循环月份 (本年至当前月份)
+        emonth = 12 if year < date.year else date.month
+        for month in range(1,emonth+1):
+            months.append((year, month,
+                is_month_open(manifest, year, month, date)))
+
+    return months
+
+##----------------------------------------------------------------------##
+# INFO: 下载所有的Dst数据到指定文件夹
+##----------------------------------------------------------------------##
+#   请求速率由http_utils.RATE_LIMITS限制, 在此速率内多个月份并发请求.
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录 [str]
+#   syear       - 开始年份 [int]
+#   nconn       - 同时请求数 [int]
+# Outputs:
+#   failed      - {数据集名称: [(任务名称, 异常信息), ...]}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/22,23; 2026/10/18
+##----------------------------------------------------------------------##
+def download_Dst_all(rootpath, syear=2018, nconn=4):
+    # 与其他数据集相同, 由fetch_engine并发执行 (失败的月份退避重试)
+    return fetch_datasets([get_dataset(rootpath, syear)],
+        limits={DST_HOST: nconn})
+
+##----------------------------------------------------------------------##
+# INFO: 数据集定义 (供fetch_engine与其他数据集并发下载)
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录 [str]
+#   syear       - 开始年份 [int]
+# Outputs:
+#   dataset     - 数据集
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_dataset(rootpath, syear=2018):
+    # 同步清单
+    manifestpath = os.path.join(rootpath, 'manifest.json')
+    manifest = load_manifest(manifestpath)
+
+    # 逐小时存档不存在时由已有文件生成
+    if not os.path.exists(os.path.join(rootpath, DST_ARCHIVE)) and \
+        os.path.exists(rootpath):
+        build_Dst_archive(rootpath)
+
+    tasks = [make_task('http', DST_HOST, sync_Dst_month,
+        rootpath, year, month, manifest, check_remote,
+        name='Dst {:d}{:02d}'.format(year, month))
+        for year, month, check_remote in get_months(syear, manifest)]
+
+    return make_dataset('Dst', tasks,
+        lambda: save_manifest(manifestpath, manifest))
 
 ##----------------------------------------------------------------------##
 if __name__ == '__main__':
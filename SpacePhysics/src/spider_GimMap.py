@@ -1,62 +1,269 @@
 ''' coding: utf-8
-INFO: 爬取ftp://ftp.gipp.org.cn/product/ionex下Gim Map (uqrg*i.Z)数据.
+INFO: 爬取ftp://ftp.gipp.org.cn/product/ionex下Gim Map (uqrg*i.Z等IONEX产品)
+      数据.
 date: 2022-03-31 Washy [CUG washy21@163.com]
 '''
 
+import io
 import os
+import sys
 import glob
-import unlzw3
-import socket
-import pathlib
+import hashlib
 import datetime
+import threading
+import types
+import zlib
+import traceback
+import contextlib
 
 import numpy as np
 
-from ftplib import FTP
-from ftplib import error_perm
-from scipy.interpolate import griddata
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+from scipy.spatial import cKDTree
+from scipy.spatial import Delaunay
+from scipy.interpolate import LinearNDInterpolator
+from scipy.interpolate import CloughTocher2DInterpolator
 
+from ftp_utils import ftp_pool
+from ftp_utils import ftp_stat
+from ftp_utils import ftp_pooled
+from ftp_utils import ftp_close_pool
+from fetch_engine import make_task
+from fetch_engine import make_dataset
+from ftp_utils import ftp_download
+from ftp_utils import ftp_iter_chunks
+from lzw_utils import iter_unlzw
+from lzw_utils import Z_CHUNKSIZE
+from lzw_utils import iter_text_lines
+from sync_manifest import is_synced
+from sync_manifest import load_manifest
+from sync_manifest import save_manifest
+from sync_manifest import update_manifest
+
+##----------------------------------------------------------------------##
+# INFO: IONEX产品 {名称: {'filename','folder','info'[,'longname']}}
 ##----------------------------------------------------------------------##
-# INFO: ftp网站连接
+#   filename/folder为格式字符串, 可用字段 year (yyyy), yy, doy (ddd);
+#   文件名以.Z/.gz结尾时按对应格式解压. 地图历元及数量从文件头读取,
+#   不同产品的时间分辨率 (15分钟/1小时/2小时) 无需单独设置.
+#   IGS分析中心自GPS周2238 (LONGNAME_START) 起改用长文件名, 登记了
+#   longname的产品自该日起使用longname.
+##----------------------------------------------------------------------##
+IONEX_HOST = 'ftp.gipp.org.cn'
+IONEX_FOLDER = '/product/ionex/{year:d}/{doy:03d}'
+LONGNAME_START = datetime.date(2022,11,27)
+PRODUCTS = {
+    'uqrg': {'filename': 'uqrg{doy:03d}0.{yy:02d}i.Z', 'folder': IONEX_FOLDER,
+        'info': 'UPC 快速, 15分钟'},
+    'codg': {'filename': 'codg{doy:03d}0.{yy:02d}i.Z', 'folder': IONEX_FOLDER,
+        'longname': 'COD0OPSFIN_{year:d}{doy:03d}0000_01D_01H_GIM.INX.gz',
+        'info': 'CODE 最终, 1小时; 2022-11-27前codg短文件名, 之后COD0OPSFIN'},
+    'corg': {'filename': 'corg{doy:03d}0.{yy:02d}i.Z', 'folder': IONEX_FOLDER,
+        'longname': 'COD0OPSRAP_{year:d}{doy:03d}0000_01D_01H_GIM.INX.gz',
+        'info': 'CODE 快速, 1小时; 2022-11-27前corg短文件名, 之后COD0OPSRAP'},
+    'jplg': {'filename': 'jplg{doy:03d}0.{yy:02d}i.Z', 'folder': IONEX_FOLDER,
+        'longname': 'JPL0OPSFIN_{year:d}{doy:03d}0000_01D_02H_GIM.INX.gz',
+        'info': 'JPL 最终, 2小时; 2022-11-27前jplg短文件名, 之后JPL0OPSFIN'},
+    'jprg': {'filename': 'jprg{doy:03d}0.{yy:02d}i.Z', 'folder': IONEX_FOLDER,
+        'longname': 'JPL0OPSRAP_{year:d}{doy:03d}0000_01D_02H_GIM.INX.gz',
+        'info': 'JPL 快速, 2小时; 2022-11-27前jprg短文件名, 之后JPL0OPSRAP'},
+    'igsg': {'filename': 'igsg{doy:03d}0.{yy:02d}i.Z', 'folder': IONEX_FOLDER,
+        'longname': 'IGS0OPSFIN_{year:d}{doy:03d}0000_01D_02H_GIM.INX.gz',
+        'info': 'IGS 最终, 2小时; 2022-11-27前igsg短文件名, 之后IGS0OPSFIN'},
+    'igrg': {'filename': 'igrg{doy:03d}0.{yy:02d}i.Z', 'folder': IONEX_FOLDER,
+        'longname': 'IGS0OPSRAP_{year:d}{doy:03d}0000_01D_02H_GIM.INX.gz',
+        'info': 'IGS 快速, 2小时; 2022-11-27前igrg短文件名, 之后IGS0OPSRAP'},
+}
+
+##----------------------------------------------------------------------##
+# INFO: 插值目标网格 {名称: (经度, 纬度)}
+##----------------------------------------------------------------------##
+GRIDS = {
+    'china': (np.arange(70,136), np.arange(10,56)),
+    'global': (np.arange(-180,180.1,5.0), np.arange(-87.5,87.6,2.5)),
+}
+# 默认产品及网格 (存储路径与之前版本一致)
+DEFAULT_PRODUCT = 'uqrg'
+DEFAULT_GRID = 'china'
+# 线程中run_captured的输出缓冲区 (由thread_stdout按线程分发)
+STDOUT_LOCAL = threading.local()
+
 ##----------------------------------------------------------------------##
+# INFO: 注册IONEX产品
+##----------------------------------------------------------------------##
+# Inputs:
+#   name        - 产品名称
+#   filename    - 文件名格式 (字段 year/yy/doy), 如'codg{doy:03d}0.{yy:02d}i.Z'
+#   folder      - ftp文件夹格式
+#   info        - 说明
+#   longname    - LONGNAME_START起的文件名格式, None时一直使用filename
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def register_product(name, filename, folder=IONEX_FOLDER, info='',
+    longname=None):
+    PRODUCTS[name] = {'filename': filename, 'folder': folder, 'info': info}
+    if longname is not None:
+        PRODUCTS[name]['longname'] = longname
+
+##----------------------------------------------------------------------##
+# INFO: 注册插值目标网格
+##----------------------------------------------------------------------##
+# Inputs:
+#   name        - 网格名称 (用于存储路径)
+#   lons        - 经度 [1D]
+#   lats        - 纬度 [1D]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def register_grid(name, lons, lats):
+    GRIDS[name] = (np.asarray(lons), np.asarray(lats))
+
+##----------------------------------------------------------------------##
+# INFO: 获取指定产品指定天的ftp文件路径及本地保存路径
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   iy          - 年份
+#   iday        - Day of Year
+#   product     - 产品名称, 见PRODUCTS
 # Outputs:
-#   ftp         - ftp根目录
+#   ftppath     - ftp文件路径 (同步清单键)
+#   savepath    - 本地保存路径 rootpath/TEMP/Z/yyyy/ddd/文件名
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/21,23,31
-##----------------------------------------------------------------------##
-def ftp_connect():
-    # FTP站点
-    host = 'ftp.gipp.org.cn'
-    # 端口号
-    port = 21
-    # 文件夹路径
-    # foldpath = '/product/ionex'
- 
-    ftp = FTP()
-    ftp.encoding = 'utf-8'
-    
-    try:
-        ftp.connect(host, port)
-        ftp.login()
-        # ftp.cwd(foldpath)
-    except(socket.error, socket.gaierror):  # ftp 连接错误
-        print("ERROR: cannot connect [{}:{}]".format(host, port))
-        return None
-    except error_perm:  # 用户登录认证错误
-        print("ERROR: user Authentication failed ")
-        return None
-    
-    return ftp
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_Z_paths(rootpath, iy, iday, product=DEFAULT_PRODUCT):
+    fields = {'year': iy, 'yy': iy%100, 'doy': iday}
+    entry = PRODUCTS[product]
+    # 长文件名 (GPS周2238起)
+    day = datetime.date(iy,1,1) + datetime.timedelta(days=iday-1)
+    if 'longname' in entry and day >= LONGNAME_START:
+        filename = entry['longname'].format(**fields)
+    else:
+        filename = entry['filename'].format(**fields)
+    ftppath = entry['folder'].format(**fields) + '/' + filename
+    savepath = os.path.join(rootpath, \
+        'TEMP/Z/{:d}/{:03d}'.format(iy,iday), filename)
 
-def is_ftp_file(ftp_conn, filename):
-    try:
-        if filename in ftp_conn.nlst(os.path.dirname(filename)):
-            return True
+    return ftppath, savepath
+
+##----------------------------------------------------------------------##
+# INFO: 解压文件路径 (去掉.Z/.gz后缀)
+##----------------------------------------------------------------------##
+def get_unpacked_path(zfilepath):
+    for ext in ('.Z', '.gz'):
+        if zfilepath.endswith(ext):
+            return zfilepath[:-len(ext)]
+    return zfilepath + '.txt'
+
+##----------------------------------------------------------------------##
+# INFO: 同步清单路径 (默认产品与之前版本一致, 其他产品各自一个清单)
+##----------------------------------------------------------------------##
+#   清单只记录Z文件的下载状态, 同一产品的不同网格共用; 各网格的TEC存储
+#   是否为最新由get_TEC_todo检查.
+##----------------------------------------------------------------------##
+def get_manifest_path(rootpath, product=DEFAULT_PRODUCT):
+    if product == DEFAULT_PRODUCT:
+        return os.path.join(rootpath,'TEMP/Z/manifest.json')
+    return os.path.join(rootpath,'TEMP/Z/manifest_{:s}.json'.format(product))
+
+##----------------------------------------------------------------------##
+# INFO: TEC存储文件夹 (默认产品及网格为rootpath/TEC, 其他为
+#       rootpath/TEC/<产品>_<网格>)
+##----------------------------------------------------------------------##
+def get_TEC_foldpath(rootpath, product=DEFAULT_PRODUCT, grid=DEFAULT_GRID):
+    if product == DEFAULT_PRODUCT and grid == DEFAULT_GRID:
+        return os.path.join(rootpath,'TEC')
+    return os.path.join(rootpath,'TEC','{:s}_{:s}'.format(product,grid))
+
+##----------------------------------------------------------------------##
+# INFO: 一天的TEC存储路径
+##----------------------------------------------------------------------##
+# Outputs:
+#   npypath     - 二进制文件路径 <TEC>/yyyy/mm/AssyyyymmddTEC.npy
+#   txtfoldpath - 文本文件夹路径 <TEC>/yyyy/mm/dd
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_TEC_paths(rootpath, iy, iday, product=DEFAULT_PRODUCT,
+    grid=DEFAULT_GRID):
+    date = datetime.datetime(iy,1,1) + datetime.timedelta(days=iday-1)
+    foldpath = get_TEC_foldpath(rootpath, product, grid)
+    npypath = os.path.join(foldpath, \
+        '{:d}/{:02d}/Ass{:d}{:02d}{:02d}TEC.npy'.format(
+        iy,date.month,iy,date.month,date.day))
+    txtfoldpath = os.path.join(foldpath, \
+        '{:d}/{:02d}/{:02d}'.format(iy,date.month,date.day))
+
+    return npypath, txtfoldpath
+
+##----------------------------------------------------------------------##
+# INFO: 获取一天中尚未生成 (或早于Z文件) 的TEC存储格式
+##----------------------------------------------------------------------##
+#   txt文件按全部地图的历元逐个检查: 历元由Z文件头获取, Z文件不存在时
+#   (不保存Z文件) 使用npy存储中的历元.
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   iy          - 年份
+#   iday        - Day of Year
+#   modes       - 存储格式, 见resave_TEC
+#   product     - 产品名称, 见PRODUCTS
+#   grid        - 插值目标网格, 见GRIDS
+#   zfilepath   - Z文件路径, None时不比较
+# Outputs:
+#   todo        - 需要存储的格式 [list]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_TEC_todo(rootpath, iy, iday, modes, product=DEFAULT_PRODUCT,
+    grid=DEFAULT_GRID, zfilepath=None):
+    # 存储路径
+    npypath, savefoldpath = get_TEC_paths(rootpath, iy, iday, product, grid)
+    if zfilepath is not None and not os.path.exists(zfilepath):
+        zfilepath = None
+
+    todo = []
+    if 'npy' in modes:
+        # Z文件重新下载后需重新存储
+        if not os.path.exists(npypath) or (zfilepath is not None and
+            os.path.getmtime(npypath) < os.path.getmtime(zfilepath)):
+            todo.append('npy')
+    if 'txt' in modes:
+        # 已有的文件名
+        filepaths = glob.glob(os.path.join(savefoldpath,'*.txt'))
+        gridpath = npypath[:-4] + '.npz'
+        if zfilepath is not None:
+            # 由文件头获取全部地图的历元 (只读取文件头)
+            with contextlib.closing(iter_ionex_lines(zfilepath,
+                get_unpacked_path(zfilepath))) as lines:
+                epochs = get_ionex_epochs(read_ionex_header(lines))
+        elif os.path.exists(gridpath):
+            # 使用npy存储中的历元
+            with np.load(gridpath) as coords:
+                epochs = coords['epochs'].astype(datetime.datetime)
+        else:
+            # 无法获取历元, 只检查是否有txt文件
+            epochs = [] if len(filepaths) > 0 else None
+
+        # 保存文件名
+        if epochs is None:
+            savepaths = None
         else:
-            return False
-    except error_perm:
-        return False
+            savepaths = [os.path.join(savefoldpath,
+                'Ass{:%Y%m%d%H%M%S}TEC.txt'.format(epoch)) for epoch in epochs]
+
+        if savepaths is None or not set(savepaths)<=set(filepaths):
+            todo.append('txt')
+
+    return todo
 
 ##----------------------------------------------------------------------##
 # INFO: 下载指定FTP文件
@@ -66,91 +273,261 @@ def is_ftp_file(ftp_conn, filename):
 #   rootpath    - 根目录
 #   iy          - 年份
 #   iday        - Day of Year
+#   manifest    - 同步清单, None时按本地文件是否存在判断
+#   recheck     - 是否检查远程文件有无更新 (False时已同步的文件不访问网络)
+#   product     - 产品名称, 见PRODUCTS
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/31
+# date: 2022/03/31; 2026/10/18
 ##----------------------------------------------------------------------##
-def download_uqrg(ftp, rootpath, iy, iday):
-    # 文件夹路径
-    foldpath = '/product/ionex/{:d}/{:03d}'.format(iy,iday)
+def download_uqrg(ftp, rootpath, iy, iday, manifest=None, recheck=True,
+    product=DEFAULT_PRODUCT):
+    # ftp文件路径 (清单键) 及保存文件路径
+    ftppath, savepath = get_Z_paths(rootpath, iy, iday, product)
     # 文件名
-    filename = 'uqrg{:03d}0.{:02d}i.Z'.format(iday,iy%100)
+    filename = os.path.basename(savepath)
     # 保存文件夹路径
-    savefoldpath = os.path.join(rootpath, \
-        'TEMP/Z/{:d}/{:03d}'.format(iy,iday))
-    # 保存文件绝对路径
-    savepath = os.path.join(savefoldpath,filename)
+    savefoldpath = os.path.dirname(savepath)
 
     # 判断是否存在
-    if os.path.exists(savepath):
+    if manifest is None:
+        if os.path.exists(savepath):
+            return
+    elif not recheck and is_synced(manifest, ftppath, savepath):
         return
 
-    # ftp跳转路径
-    try:
-        ftp.cwd(foldpath)
-    except:
-        print('文件夹' + foldpath + '不存在!')
+    # FTP: 文件属性 (文件夹列表有缓存, 不存在的文件夹视为无文件)
+    remote = ftp_stat(ftp, ftppath)
+    if remote is None:
+        print('文件' + filename + '不存在!')
+        return
+
+    # 远程文件无变化
+    if manifest is not None and is_synced(manifest, ftppath, savepath, remote):
+        return
+
+    print('正在下载{:d}第{:03d}天数据'.format(iy,iday))
     
-    # FTP: 文件名是否存在
-    if is_ftp_file(ftp, filename):
-        print('正在下载{:d}第{:03d}天数据'.format(iy,iday))
-        
-        # 创建文件夹
+    # 创建文件夹
+    if not os.path.exists(savefoldpath):
+        os.makedirs(savefoldpath)
+    
+    # 下载指定文件 (断点续传, 完成后重命名)
+    ftp_download(ftp, ftppath, savepath, remote)
+
+    # 记录同步信息
+    if manifest is not None:
+        update_manifest(manifest, ftppath, savepath, remote)
+
+##----------------------------------------------------------------------##
+# INFO: 边下载边解压解析, 直接生成TEC存储 (流水线模式)
+##----------------------------------------------------------------------##
+#   retr接收的数据块依次经过LZW解压、IONEX解析, 只遍历一次数据, 不写入
+#   解压文件; keep_raw为True时同时保存Z文件. 同步清单只记录下载状态 (同
+#   一产品的各网格共用), 当前网格的TEC存储另行检查; 已保存的Z文件为最新
+#   时直接由其生成缺少的存储, 不重新下载.
+##----------------------------------------------------------------------##
+# Inputs:
+#   ftp         - ftp
+#   rootpath    - 根目录
+#   iy          - 年份
+#   iday        - Day of Year
+#   manifest    - 同步清单, None时按本地文件是否存在判断
+#   recheck     - 是否检查远程文件有无更新
+#   keep_raw    - 是否保存Z文件
+#   modes       - TEC存储格式, 见resave_TEC
+#   product     - 产品名称, 见PRODUCTS
+#   grid        - 插值目标网格, 见GRIDS
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def download_resave_uqrg(ftp, rootpath, iy, iday, manifest=None, recheck=True,
+    keep_raw=True, modes=('npy',), product=DEFAULT_PRODUCT, grid=DEFAULT_GRID):
+    # ftp文件路径 (清单键) 及保存文件路径
+    ftppath, savepath = get_Z_paths(rootpath, iy, iday, product)
+    # 文件名
+    filename = os.path.basename(savepath)
+    # 保存文件夹路径
+    savefoldpath = os.path.dirname(savepath)
+    # 不保存Z文件时只比较远程属性
+    localpath = savepath if keep_raw else None
+
+    # 尚未生成的TEC存储格式 (下载与TEC存储均为最新时才跳过)
+    todo = get_TEC_todo(rootpath, iy, iday, modes, product, grid, localpath)
+
+    # 判断下载是否为最新 (不访问网络)
+    if manifest is None:
+        current = os.path.exists(savepath) if keep_raw else len(todo) == 0
+    else:
+        current = not recheck and is_synced(manifest, ftppath, localpath)
+
+    # FTP: 文件属性 (已下载的Z文件可直接使用时不访问网络)
+    if not current or (len(todo) > 0 and not keep_raw):
+        remote = ftp_stat(ftp, ftppath)
+        if remote is None:
+            print('文件' + filename + '不存在!')
+            return
+        # 远程文件无变化
+        current = manifest is not None and \
+            is_synced(manifest, ftppath, localpath, remote)
+
+    if current and len(todo) == 0:
+        return
+    # 同一产品的Z文件已为最新, 只缺少当前网格的TEC存储: 由Z文件生成
+    if current and keep_raw:
+        print('正在存储{:d}第{:03d}天数据'.format(iy,iday))
+        save_TEC(rootpath, iy, iday, iter_ionex_lines(savepath), todo,
+            product, grid)
+        return
+
+    print('正在下载并存储{:d}第{:03d}天数据'.format(iy,iday))
+
+    # 接收 -> (保存Z文件) -> 解压 -> 逐行解析
+    chunks = ftp_iter_chunks(ftp, ftppath, remote.get('size'))
+    if keep_raw:
         if not os.path.exists(savefoldpath):
             os.makedirs(savefoldpath)
-        
-        # 下载指定文件到临时文件
-        with open(savepath, 'wb') as f:
-            ftp.retrbinary('RETR ' + filename, f.write, 1024)
+        chunks = tee_file(chunks, savepath)
+    save_TEC(rootpath, iy, iday, iter_text_lines(iter_unpack(chunks,
+        filename)), modes, product, grid)
+
+    # 记录同步信息
+    if manifest is not None:
+        update_manifest(manifest, ftppath, localpath, remote)
+
+##----------------------------------------------------------------------##
+# INFO: 判断解压文件是否存在且不早于Z文件 (Z文件重新下载后需重新解压)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def is_unpacked(zfilepath, filepath):
+    return os.path.exists(filepath) and \
+        os.path.getmtime(filepath) >= os.path.getmtime(zfilepath)
+
+##----------------------------------------------------------------------##
+# INFO: 边产生边写入数据块, 全部写入后重命名 (中断时不留下不完整文件)
+##----------------------------------------------------------------------##
+# Inputs:
+#   chunks      - 数据块的迭代器 [bytes]
+#   filepath    - 写入文件路径
+# Outputs:
+#   chunks      - 原数据块的生成器
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def tee_file(chunks, filepath):
+    # 临时文件名包含进程及线程号 (不同网格的数据集可能同时下载同一文件)
+    temppath = filepath + '.{:d}.{:d}.tmp'.format(os.getpid(),
+        threading.get_ident())
+    done = False
+    try:
+        with open(temppath, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(temppath, filepath)
+        done = True
+    finally:
+        if not done and os.path.exists(temppath):
+            os.remove(temppath)
+
+##----------------------------------------------------------------------##
+# INFO: 按文件名后缀逐块解压 (.Z为LZW, .gz为gzip, 其他不解压)
+##----------------------------------------------------------------------##
+# Inputs:
+#   chunks      - 压缩数据块的迭代器
+#   filename    - 压缩文件名
+# Outputs:
+#   chunks      - 解压数据块的生成器
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def iter_unpack(chunks, filename):
+    if filename.endswith('.Z'):
+        yield from iter_unlzw(chunks)
+    elif filename.endswith('.gz'):
+        decomp = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            yield decomp.decompress(chunk)
+        yield decomp.flush()
     else:
-        print('文件' + filename + '不存在!')
+        yield from chunks
+
+def iter_packed_file(zfilepath, chunksize=Z_CHUNKSIZE):
+    with open(zfilepath, 'rb') as f:
+        yield from iter_unpack(iter(lambda: f.read(chunksize), b''), zfilepath)
+
+##----------------------------------------------------------------------##
+# INFO: 逐行读取IONEX文件 (每个Z文件只解压一次)
+##----------------------------------------------------------------------##
+#   已解压的文件不早于Z文件时直接读取; 否则流式解压Z文件, filepath不为
+#   None时同时写入解压文件, 供之后的步骤使用.
+##----------------------------------------------------------------------##
+# Inputs:
+#   zfilepath   - Z文件路径
+#   filepath    - 解压文件路径, None时不写入
+# Outputs:
+#   lines       - 文本行的生成器 (不含换行符)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def iter_ionex_lines(zfilepath, filepath=None):
+    if filepath is not None and is_unpacked(zfilepath, filepath):
+        with open(filepath, 'r') as f:
+            for line in f:
+                yield line.rstrip('\r\n')
+        return
+
+    chunks = iter_packed_file(zfilepath)
+    if filepath is not None:
+        chunks = tee_file(chunks, filepath)
+    yield from iter_text_lines(chunks)
 
 ##----------------------------------------------------------------------##
 # INFO: 解压Z文件
 ##----------------------------------------------------------------------##
 # Inputs:
 #   rootpath    - 根目录
+#   iy          - 年份
+#   iday        - Day of Year
+#   product     - 产品名称, 见PRODUCTS
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/05/07,12
+# date: 2022/05/07,12; 2026/10/18
 ##----------------------------------------------------------------------##
-def unpack_Z(rootpath,iy,iday):
-    # 保存文件夹路径
-    foldpath = os.path.join(rootpath, \
-        'TEMP/Z/{:d}/{:03d}'.format(iy,iday))
-    # 文件名
-    filename = 'uqrg{:03d}0.{:02d}i'.format(iday,iy%100)
-    zfilename = 'uqrg{:03d}0.{:02d}i.Z'.format(iday,iy%100)
-    # 保存文件绝对路径
-    filepath = os.path.join(foldpath,filename)
-    zfilepath = os.path.join(foldpath,zfilename)
+def unpack_Z(rootpath,iy,iday,product=DEFAULT_PRODUCT):
+    # 压缩文件及解压文件绝对路径
+    zfilepath = get_Z_paths(rootpath,iy,iday,product)[1]
+    filepath = get_unpacked_path(zfilepath)
     
     if not os.path.exists(zfilepath):
         return
     
-    # 判断是否存在
-    if not os.path.exists(filepath):
-        data = unlzw3.unlzw(pathlib.Path(zfilepath))
-        
-        with open(filepath,'wb') as f:
-            f.write(data)
+    # 判断是否存在 (Z文件重新下载后需重新解压)
+    if not is_unpacked(zfilepath, filepath):
+        # 流式解压, 逐块写入
+        for chunk in tee_file(iter_packed_file(zfilepath), filepath):
+            pass
 
 ##----------------------------------------------------------------------##
-# INFO: 下载2021年至今所有的ursg*i.Z文件
+# INFO: 获取2021年至今需处理的日期列表 (倒序)
 ##----------------------------------------------------------------------##
-# Inputs:
-#   rootpath    - 根目录
+# Outputs:
+#   days        - [(iy,iday), ...]
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/31, 05/12
+# date: 2022/03/31, 05/12; 2026/10/18
 ##----------------------------------------------------------------------##
-def download_uqrg_all(rootpath):
-    # 连接服务器
-    ftp = ftp_connect()
-
+def get_days():
     # 获取当前世界时
     utc = datetime.datetime.utcnow()
 
+    days = []
     # 倒叙 year
     for iy in range(utc.year,2020,-1):
         if iy == utc.year:
@@ -165,190 +542,780 @@ def download_uqrg_all(rootpath):
         
         # 倒叙 DoY
         for iday in range(sday,eday,-1):
-            # 下载文件
-            download_uqrg(ftp,rootpath,iy,iday)
-            # 解压文件
-            unpack_Z(rootpath,iy,iday)
+            days.append((iy,iday))
 
-    # 断开服务器
-    ftp.quit()
+    return days
 
 ##----------------------------------------------------------------------##
-# INFO: 重新存储指定年指定天的TEC数据
+# INFO: 执行函数并捕获其打印信息与异常 (用于多进程中按顺序输出)
+##----------------------------------------------------------------------##
+# Inputs:
+#   func        - 需执行的函数
+#   *args       - 函数参数
+#   **kwargs    - 函数关键字参数
+# Outputs:
+#   output      - 函数打印信息 [str]
+#   error       - 异常信息, 无异常时为None [str]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def run_captured(func, *args, **kwargs):
+    buf = io.StringIO()
+    error = None
+    if threading.current_thread() is threading.main_thread():
+        ctx = contextlib.redirect_stdout(buf)
+    else:
+        # 线程中由thread_stdout按线程分发 (redirect_stdout会影响其他线程)
+        STDOUT_LOCAL.buf = buf
+        ctx = contextlib.nullcontext()
+    with ctx:
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            error = traceback.format_exc()
+    vars(STDOUT_LOCAL).pop('buf', None)
+
+    return buf.getvalue(), error
+
+##----------------------------------------------------------------------##
+# INFO: 按线程分发的标准输出 (线程中run_captured的打印信息写入各自缓冲区)
+##----------------------------------------------------------------------##
+# Inputs:
+#   stream      - 原标准输出
+# Outputs:
+#   stdout      - 可用于contextlib.redirect_stdout的输出对象
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def thread_stdout(stream):
+    def write(text):
+        return getattr(STDOUT_LOCAL, 'buf', stream).write(text)
+    def flush():
+        getattr(STDOUT_LOCAL, 'buf', stream).flush()
+
+    return types.SimpleNamespace(write=write, flush=flush)
+
+##----------------------------------------------------------------------##
+# INFO: 按顺序输出逐日任务结果, 返回失败的日期
+##----------------------------------------------------------------------##
+# Inputs:
+#   days        - [(iy,iday), ...]
+#   results     - 与days对应的(output,error)迭代器
+#   title       - 提示信息
+# Outputs:
+#   failed      - 失败的日期及异常信息 [(iy,iday,error), ...]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def report_days(days, results, title):
+    failed = []
+    for idx, ((iy,iday), (output,error)) in enumerate(zip(days,results)):
+        print("[{:d}/{:d}] {:s}{:d}年第{:03d}天数据".format(
+            idx+1,len(days),title,iy,iday))
+        if output:
+            print(output, end='')
+        if error is not None:
+            print("ERROR: {:d}年第{:03d}天数据{:s}失败\n{:s}".format(
+                iy,iday,title,error), end='')
+            failed.append((iy,iday,error))
+
+    if len(failed) > 0:
+        print("{:s}失败{:d}天: ".format(title,len(failed)) + \
+            ', '.join('{:d}-{:03d}'.format(iy,iday) for iy,iday,_ in failed))
+
+    return failed
+
+##----------------------------------------------------------------------##
+# INFO: 下载2021年至今所有的ursg*i.Z文件 (或其他IONEX产品)
+##----------------------------------------------------------------------##
+#   流水线模式下解压、解析及插值在nconn个下载线程中进行 (受GIL限制基本只
+#   使用单核), 不使用nworkers; 需多核处理时使用非流水线模式及
+#   resave_TEC_all.
 ##----------------------------------------------------------------------##
 # Inputs:
 #   rootpath    - 根目录
-#   iy          - 年份
-#   iday        - Day of Year
+#   nworkers    - 解压进程数, 1时在本进程中解压 (流水线模式下不使用)
+#   nconn       - 同时下载的ftp连接数上限
+#   recheck_days - 最近多少天的文件检查远程更新, 更早的已同步文件不访问网络
+#   pipeline    - 是否边下载边解压解析直接生成TEC存储 (不写入解压文件)
+#   keep_raw    - 流水线模式下是否保存Z文件
+#   modes       - 流水线模式下的TEC存储格式
+#   product     - 产品名称, 见PRODUCTS
+#   grid        - 流水线模式下的插值目标网格, 见GRIDS
+# Outputs:
+#   failed      - 流水线模式下失败的日期及异常信息 [(iy,iday,error), ...],
+#                 非流水线模式下为解压失败的日期
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/31，04/01,19
+# date: 2022/03/31, 05/12; 2026/10/18
 ##----------------------------------------------------------------------##
-def resave_TEC(rootpath, iy, iday):
-    # 文件夹路径
-    zfoldpath = os.path.join(rootpath, \
-        'TEMP/Z/{:d}/{:03d}'.format(iy,iday))
-    # 文件名
-    zfilename = 'uqrg{:03d}0.{:02d}i.Z'.format(iday,iy%100)
-    # 压缩文件绝对路径
-    zfilepath = os.path.join(zfoldpath,zfilename)
-    # 判断压缩文件是否存在
-    if not os.path.exists(zfilepath):
-        print("无数据")
-        return
+def download_uqrg_all(rootpath, nworkers=1, nconn=1, recheck_days=3,
+    pipeline=False, keep_raw=True, modes=('npy',), product=DEFAULT_PRODUCT,
+    grid=DEFAULT_GRID):
+    if pipeline and nworkers > 1:
+        print('WARNING: 流水线模式在下载线程中处理, 不使用nworkers={:d}'.format(
+            nworkers))
 
-    # 当前日期
-    date = datetime.datetime(iy,1,1) + datetime.timedelta(days=iday-1)
+    # 连接池 (使用时再连接)
+    pool = ftp_pool(IONEX_HOST, nconn)
 
-    # 保存文件夹路径
-    savefoldpath = os.path.join(rootpath, \
-        'TEC/{:d}/{:02d}/{:02d}'.format(iy,date.month,date.day))
-    
-    # HMS
-    hms = ['0000', '0015', '0030', '0045', '0100', '0115', '0130', '0145', 
-        '0200', '0215', '0230', '0245', '0300', '0315', '0330', '0345', 
-        '0400', '0415', '0430', '0445', '0500', '0515', '0530', '0545', 
-        '0600', '0615', '0630', '0645', '0700', '0715', '0730', '0745', 
-        '0800', '0815', '0830', '0845', '0900', '0915', '0930', '0945', 
-        '1000', '1015', '1030', '1045', '1100', '1115', '1130', '1145', 
-        '1200', '1215', '1230', '1245', '1300', '1315', '1330', '1345', 
-        '1400', '1415', '1430', '1445', '1500', '1515', '1530', '1545', 
-        '1600', '1615', '1630', '1645', '1700', '1715', '1730', '1745', 
-        '1800', '1815', '1830', '1845', '1900', '1915', '1930', '1945', 
-        '2000', '2015', '2030', '2045', '2100', '2115', '2130', '2145', 
-        '2200', '2215', '2230', '2245', '2300', '2315', '2330', '2345']
-    # 保存文件名
-    savepaths = [savefoldpath + \
-        '/Ass{:d}{:02d}{:02d}'.format(iy,date.month,date.day) \
-        + hms[i] + '00TEC.txt' for i in range(96)]
-    
-    # 已有的文件名
-    filepaths = glob.glob(os.path.join(savefoldpath,'*.txt'))
-    # 所有文件已存在则终止
-    if set(savepaths)<=set(filepaths):
-        print("数据文件已存在")
-        return
-    
+    # 同步清单
+    manifestpath = get_manifest_path(rootpath, product)
+    manifest = load_manifest(manifestpath)
+
+    days = get_days()
+    # 需检查远程更新的最早日期
+    rdate = datetime.datetime.utcnow() - datetime.timedelta(days=recheck_days)
+    recheck = [datetime.datetime(iy,1,1)+datetime.timedelta(days=iday-1) >= \
+        rdate for iy,iday in days]
+    failed = []
+    try:
+        if pipeline:
+            # 流水线模式: 下载线程中直接生成TEC存储, 每天的打印信息与异常
+            # 按顺序输出
+            with contextlib.redirect_stdout(thread_stdout(sys.stdout)), \
+                ThreadPoolExecutor(max_workers=nconn) as downloader:
+                downloads = [downloader.submit(run_captured,ftp_pooled,pool,
+                    download_resave_uqrg,rootpath,iy,iday,manifest,flag,
+                    keep_raw=keep_raw,modes=modes,product=product,grid=grid)
+                    for (iy,iday),flag in zip(days,recheck)]
+                failed = report_days(days,
+                    (each.result() for each in downloads), '存储')
+        else:
+            with ThreadPoolExecutor(max_workers=nconn) as downloader:
+                # 最多nconn个文件同时下载
+                downloads = [downloader.submit(ftp_pooled,pool,download_uqrg,
+                    rootpath,iy,iday,manifest,flag,product=product)
+                    for (iy,iday),flag in zip(days,recheck)]
+
+                if nworkers > 1:
+                    # 按顺序等待下载完成, 同时在进程池中解压
+                    with ProcessPoolExecutor(max_workers=nworkers) as executor:
+                        futures = []
+                        for (iy,iday), each in zip(days,downloads):
+                            check_download(iy, iday, each)
+                            futures.append(executor.submit(
+                                run_captured,unpack_Z,rootpath,iy,iday,product))
+                        failed = report_days(days,
+                            (each.result() for each in futures), '解压')
+                else:
+                    for (iy,iday), each in zip(days,downloads):
+                        check_download(iy, iday, each)
+                        # 解压文件
+                        unpack_Z(rootpath,iy,iday,product)
+    finally:
+        # 保存同步清单 (中断时保留已完成部分)
+        save_manifest(manifestpath, manifest)
+
+        # 断开服务器
+        ftp_close_pool(pool)
+
+    return failed
+
+##----------------------------------------------------------------------##
+# INFO: 等待下载完成, 失败时打印异常 (已有的Z文件仍可解压)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def check_download(iy, iday, future):
+    error = future.exception()
+    if error is not None:
+        print('ERROR: {:d}年第{:03d}天数据下载失败 ({})'.format(iy,iday,error))
+
+##----------------------------------------------------------------------##
+# INFO: 数据集定义 (供fetch_engine与其他数据集并发下载)
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   recheck_days - 最近多少天的文件检查远程更新
+#   pipeline    - 是否边下载边生成TEC存储, 见download_uqrg_all
+#   keep_raw    - 流水线模式下是否保存Z文件
+#   modes       - 流水线模式下的TEC存储格式
+#   product     - 产品名称, 见PRODUCTS
+#   grid        - 流水线模式下的插值目标网格, 见GRIDS
+# Outputs:
+#   dataset     - 数据集 (每天一个下载任务, 完成后保存同步清单)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_dataset(rootpath, recheck_days=3, pipeline=False, keep_raw=True,
+    modes=('npy',), product=DEFAULT_PRODUCT, grid=DEFAULT_GRID):
+    # 同步清单
+    manifestpath = get_manifest_path(rootpath, product)
+    manifest = load_manifest(manifestpath)
+    # 数据集名称
+    name = 'GimMap' if product == DEFAULT_PRODUCT else 'GimMap ' + product
+
+    # 需检查远程更新的最早日期
+    rdate = datetime.datetime.utcnow() - datetime.timedelta(days=recheck_days)
+
+    tasks = []
+    for iy,iday in get_days():
+        recheck = datetime.datetime(iy,1,1) + \
+            datetime.timedelta(days=iday-1) >= rdate
+        if pipeline:
+            tasks.append(make_task('ftp',IONEX_HOST,
+                download_resave_uqrg,rootpath,iy,iday,manifest,recheck,
+                keep_raw,modes,product,grid,
+                name='{:s} {:d}-{:03d}'.format(name,iy,iday)))
+        else:
+            tasks.append(make_task('ftp',IONEX_HOST,download_uqrg,
+                rootpath,iy,iday,manifest,recheck,product,
+                name='{:s} {:d}-{:03d}'.format(name,iy,iday)))
+
+    return make_dataset(name, tasks,
+        lambda: save_manifest(manifestpath, manifest))
+
+##----------------------------------------------------------------------##
+# INFO: 解析IONEX定宽(I5)数据字段
+##----------------------------------------------------------------------##
+# Inputs:
+#   fields      - 字段字符数组 [uint8, (..., 5)]
+# Outputs:
+#   values      - 字段对应的整数 [int16, (...)]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def decode_ionex_fields(fields):
+    # 数字字符及负号
+    isdigit = (fields>=48) & (fields<=57)
+    isneg = (fields==45).any(axis=-1)
+
+    # 按位累加数字
+    values = np.zeros(fields.shape[:-1], dtype=np.int32)
+    for k in range(fields.shape[-1]):
+        values = np.where(isdigit[...,k],
+            values*10 + fields[...,k].astype(np.int32) - 48, values)
+    values[isneg] *= -1
+
+    return values.astype(np.int16)
+
+##----------------------------------------------------------------------##
+# INFO: 解析IONEX文件头 (读取至END OF HEADER为止)
+##----------------------------------------------------------------------##
+# Inputs:
+#   lines       - IONEX文件文本行的迭代器 (读取文件头后可继续读取地图)
+# Outputs:
+#   header      - 文件头信息 {'hgt','lats','lons','exponent','first',
+#                 'last','interval','nmaps'}, 后四项在文件头中没有时不存在
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def read_ionex_header(lines):
+    # 文件头默认指数
+    header = {'exponent': -1}
+    for line in lines:
+        # 标签 (第61-80列)
+        label = line[60:80].strip()
+        if label == 'HGT1 / HGT2 / DHGT':
+            header['hgt'] = float(line[2:8])
+        elif label == 'LAT1 / LAT2 / DLAT':
+            LAT1,LAT2,DLAT = [float(line[i:i+6]) for i in (2,8,14)]
+            numLat = int(round((LAT2-LAT1)/DLAT)) + 1
+            header['lats'] = LAT1 + DLAT*np.arange(numLat)
+        elif label == 'LON1 / LON2 / DLON':
+            LON1,LON2,DLON = [float(line[i:i+6]) for i in (2,8,14)]
+            numLon = int(round((LON2-LON1)/DLON)) + 1
+            header['lons'] = LON1 + DLON*np.arange(numLon)
+        elif label == 'EXPONENT':
+            header['exponent'] = int(line[:6])
+        elif label == 'EPOCH OF FIRST MAP':
+            header['first'] = datetime.datetime(*[int(line[i:i+6])
+                for i in range(0,36,6)])
+        elif label == 'EPOCH OF LAST MAP':
+            header['last'] = datetime.datetime(*[int(line[i:i+6])
+                for i in range(0,36,6)])
+        elif label == 'INTERVAL':
+            header['interval'] = int(line[:6])
+        elif label == '# OF MAPS IN FILE':
+            header['nmaps'] = int(line[:6])
+        elif label == 'END OF HEADER':
+            if 'lats' not in header or 'lons' not in header:
+                break
+            return header
+
+    raise ValueError('IONEX文件头不完整')
+
+##----------------------------------------------------------------------##
+# INFO: 由文件头计算全部地图的历元
+##----------------------------------------------------------------------##
+# Inputs:
+#   header      - 文件头信息 (read_ionex_header)
+# Outputs:
+#   epochs      - 每幅地图的历元 [list of datetime], 文件头信息不足时为None
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_ionex_epochs(header):
+    if 'first' not in header or 'nmaps' not in header:
+        return None
+    interval = header.get('interval', 0)
+    if interval <= 0 and 'last' in header and header['nmaps'] > 1:
+        interval = (header['last'] - header['first']).total_seconds() / \
+            (header['nmaps'] - 1)
+    if interval <= 0 and header['nmaps'] > 1:
+        return None
+
+    return [header['first'] + datetime.timedelta(seconds=k*interval)
+        for k in range(header['nmaps'])]
+
+##----------------------------------------------------------------------##
+# INFO: 解析IONEX文件中的全部TEC地图
+##----------------------------------------------------------------------##
+#   地图数量及历元以文件中的地图为准 (不同产品为15分钟/1小时/2小时).
+##----------------------------------------------------------------------##
+# Inputs:
+#   lines       - IONEX文件文本行 (可迭代对象, 单次遍历)
+# Outputs:
+#   header      - 文件头信息, 见read_ionex_header
+#   epochs      - 每幅地图的历元 [list of datetime]
+#   exponents   - 每幅地图的指数 [int, (n_maps,)]
+#   tec         - TEC原始值 [int16, (n_maps,n_lat,n_lon)]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def read_ionex(lines):
+    lines = iter(lines)
+    header = read_ionex_header(lines)
+    numLat = len(header['lats'])
+    numLon = len(header['lons'])
+    # 每个纬度对应的数据行数
+    rows_lat = (numLon-1)//16 + 1
+
+    epochs = []
+    exponents = []
+    # TEC数据行
+    rows = []
+
+    # 状态: TEC地图内/剩余数据行数
+    in_map = False
+    nrow = 0
+    for line in lines:
+        # 数据行
+        if nrow > 0:
+            rows.append(line[:80].ljust(80))
+            nrow -= 1
+            continue
+
+        # 标签 (第61-80列)
+        label = line[60:80].strip()
+        if label == 'START OF TEC MAP':
+            in_map = True
+            epochs.append(None)
+            exponents.append(header['exponent'])
+        elif label == 'END OF TEC MAP':
+            in_map = False
+        elif in_map and label == 'EPOCH OF CURRENT MAP':
+            epochs[-1] = datetime.datetime(*[int(line[i:i+6])
+                for i in range(0,36,6)])
+        elif in_map and label == 'EXPONENT':
+            exponents[-1] = int(line[:6])
+        elif in_map and label == 'LAT/LON1/LON2/DLON/H':
+            nrow = rows_lat
+
+    numMap = len(epochs)
+    if len(rows) != numMap*numLat*rows_lat:
+        raise ValueError('IONEX数据行数不匹配: {:d}幅地图, {:d}行'.format(
+            numMap,len(rows)))
+
+    # 定宽字段一次性解析
+    fields = np.frombuffer(''.join(rows).encode('ascii'), dtype=np.uint8)
+    fields = fields.reshape(numMap,numLat,rows_lat*16,5)[:,:,:numLon,:]
+    tec = decode_ionex_fields(fields)
+
+    return header, epochs, np.array(exponents), tec
+
+##----------------------------------------------------------------------##
+# INFO: 插值网格缓存 (进程内)
+##----------------------------------------------------------------------##
+#   三角剖分不到0.1秒, 每个进程首次使用时建立即可, 不写入磁盘.
+##----------------------------------------------------------------------##
+REGRID_CACHE = {}
+
+##----------------------------------------------------------------------##
+# INFO: 获取源网格至目标网格的插值预计算结果 (三角剖分/最近邻索引)
+##----------------------------------------------------------------------##
+# Inputs:
+#   src_lons    - 源网格经度 [1D]
+#   src_lats    - 源网格纬度 [1D]
+#   dst_lons    - 目标网格经度 [1D]
+#   dst_lats    - 目标网格纬度 [1D]
+#   method      - 插值方法 'cubic'/'linear'/'nearest'
+# Outputs:
+#   regrid      - 'cubic'/'linear'为Delaunay三角剖分, 'nearest'为索引
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_regrid(src_lons, src_lats, dst_lons, dst_lats, method='cubic'):
+    # 以网格定义及插值方法生成缓存键
+    sha = hashlib.sha1(method.encode())
+    for each in (src_lons, src_lats, dst_lons, dst_lats):
+        each = np.asarray(each, dtype=np.float64)
+        sha.update(str(each.shape).encode())
+        sha.update(each.tobytes())
+    key = sha.hexdigest()[:16]
+
+    # 内存缓存
+    if key in REGRID_CACHE:
+        return REGRID_CACHE[key]
+
+    # 源网格点
+    plons1,plats1 = np.meshgrid(src_lons,src_lats)
+    points = np.column_stack((plons1.flatten(),plats1.flatten()))
+    if method in ('cubic','linear'):
+        regrid = Delaunay(points)
+    elif method == 'nearest':
+        plons2,plats2 = np.meshgrid(dst_lons,dst_lats)
+        regrid = cKDTree(points).query(
+            np.column_stack((plons2.flatten(),plats2.flatten())))[1]
+    else:
+        raise ValueError('未知插值方法: ' + method)
+
+    REGRID_CACHE[key] = regrid
+
+    return regrid
+
+##----------------------------------------------------------------------##
+# INFO: 批量插值多幅地图至目标网格 (结果与逐幅griddata一致)
+##----------------------------------------------------------------------##
+# Inputs:
+#   maps        - 源网格数据 [(n_maps,n_lat,n_lon)]
+#   src_lons    - 源网格经度 [1D]
+#   src_lats    - 源网格纬度 [1D]
+#   dst_lons    - 目标网格经度 [1D]
+#   dst_lats    - 目标网格纬度 [1D]
+#   method      - 插值方法 'cubic'/'linear'/'nearest'
+# Outputs:
+#   npdata      - 目标网格数据 [(n_maps,n_dst_lat,n_dst_lon)]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def regrid_maps(maps, src_lons, src_lats, dst_lons, dst_lats,
+    method='cubic'):
+    regrid = get_regrid(src_lons, src_lats, dst_lons, dst_lats, method)
+
+    # 每列为一幅地图
+    numMap = maps.shape[0]
+    values = maps.reshape(numMap,-1).T.astype(float)
+
+    plons2,plats2 = np.meshgrid(dst_lons,dst_lats)
+    if method == 'cubic':
+        npdata = CloughTocher2DInterpolator(regrid, values)(plons2,plats2)
+    elif method == 'linear':
+        npdata = LinearNDInterpolator(regrid, values)(plons2,plats2)
+    else:
+        npdata = values[regrid].reshape(plons2.shape + (numMap,))
+
+    return np.moveaxis(npdata, -1, 0)
+
+##----------------------------------------------------------------------##
+# INFO: 存储一天的TEC数据至txt文件 (每幅地图一个文件)
+##----------------------------------------------------------------------##
+# Inputs:
+#   savefoldpath - 保存文件夹路径
+#   epochs      - 每幅地图的历元 [list of datetime]
+#   hgt         - 海拔高度 [km]
+#   lons        - 经度 [1D]
+#   lats        - 纬度 [1D]
+#   npdata      - TEC原始值 [(n_maps,n_lat,n_lon)], 单位为10^exponent TECU
+#   exponents   - 每幅地图的指数 [(n_maps,)], None时为-1 (0.1 TECU)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/31，04/01,19; 2026/10/18
+##----------------------------------------------------------------------##
+def save_TEC_txt(savefoldpath, epochs, hgt, lons, lats, npdata, exponents=None):
     # 创建文件夹
     if not os.path.exists(savefoldpath):
         os.makedirs(savefoldpath)
 
-    # 读取压缩文件数据
-    data = unlzw3.unlzw(pathlib.Path(zfilepath)).decode().splitlines()
-
-    # 海拔高度
-    HGT = data[20][2:8]
-    # 纬度
-    LAT1 = float(data[21][2:8])
-    LAT2 = float(data[21][8:14])
-    DLAT = float(data[21][14:20])
-    LATs = [LAT1+DLAT*i for i in range(int((LAT2-LAT1)/DLAT)+1)]
-    numLat = len(LATs)
-    # 经度
-    LON1 = float(data[22][2:8])
-    LON2 = float(data[22][8:14])
-    DLON = float(data[22][14:20])
-    LONs = [LON1+DLON*i for i in range(int((LON2-LON1)/DLON)+1)]
-    numLon = len(LONs)
-
-    plons1,plats1 = np.meshgrid(LONs,LATs)
-    plons2,plats2 = np.meshgrid(np.arange(70,136),np.arange(10,56))
-    
-    # 每个纬度对应的数据行数
-    rows_lat = int((numLon-1)/16) + 1
-    # 每个文件的数据行数
-    rows_file = numLat*(rows_lat+1) + 3
-    # 文件头描述信息行数
-    for idx in range(len(data)):
-        if "END OF HEADER" in data[idx]:
-            idx0 = idx + 1
-
-    # 遍历文件名
-    for ifile in range(96):#96
-        # 
-        npdata1 = np.zeros([numLat,numLon])
-        # 本文件数据范围
-        data1 = data[rows_file*ifile+idx0+2:rows_file*(ifile+1)+idx0-1]
-        # 遍历纬度
-        for ilat in range(numLat):#numLat
-            # 本纬度的数据范围
-            data2 = ''.join(
-                data1[(rows_lat+1)*ilat+1:(rows_lat+1)*(ilat+1)]
-            ).split()
-            # 遍历经度
-            npdata1[ilat,:] = data2
-
-        # 数据插值
-        npdata2 = griddata((plons1.flatten(),plats1.flatten()),npdata1.flatten(),
-            (plons2,plats2),method='cubic')
-        
-        fplons2 = plons2.T.flatten()
-        fplats2 = plats2.T.flatten()
-        fpdata2 = npdata2.T.flatten()
+    plons,plats = np.meshgrid(lons,lats)
+    fplons = plons.T.flatten()
+    fplats = plats.T.flatten()
+
+    # 遍历地图
+    for imap in range(len(epochs)):
+        fpdata = npdata[imap].T.flatten()
 
         # 存储数据
-        f = open(savepaths[ifile], 'w')
-        f.write("# Date: {:d}-{:02d}-{:02d} {}:{}:00\n".format(
-            iy,date.month,date.day,hms[ifile][0:2],hms[ifile][2:4]
-        ))
+        epoch = epochs[imap]
+        f = open(savefoldpath + \
+            '/Ass{:%Y%m%d%H%M%S}TEC.txt'.format(epoch), 'w')
+        f.write("# Date: {:%Y-%m-%d %H:%M:%S}\n".format(epoch))
         f.write("# Ionospheric TEC Parameter\n")
-        f.write("# TEC values in 0.1 TECUs; {}km\n".format(HGT))
+        exponent = -1 if exponents is None else int(exponents[imap])
+        f.write("# TEC values in {:g} TECUs; {:6.1f}km\n".format(
+            10.0**exponent,hgt))
         f.write("#----------------------------------------\n")
         f.write("  Long    Lat    TEC\n")
 
-        for idx in range(len(fpdata2)):
+        for idx in range(len(fpdata)):
             f.write("{:6.1f} {:6.1f} {:6.1f}\n".format(
-                fplons2[idx],fplats2[idx],fpdata2[idx]
+                fplons[idx],fplats[idx],fpdata[idx]
             ))
 
         f.close()
+
+##----------------------------------------------------------------------##
+# INFO: 存储一天的TEC数据至npy二进制文件
+##----------------------------------------------------------------------##
+# Inputs:
+#   savepath    - 保存文件路径 (.npy, 坐标信息及指数存储于同名.npz)
+#   epochs      - 每幅地图的历元 [list of datetime]
+#   hgt         - 海拔高度 [km]
+#   lons        - 经度 [1D]
+#   lats        - 纬度 [1D]
+#   npdata      - TEC原始值 [(n_maps,n_lat,n_lon)], 单位为10^exponent TECU
+#   exponents   - 每幅地图的指数 [(n_maps,)], None时为-1 (0.1 TECU)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def save_TEC_npy(savepath, epochs, hgt, lons, lats, npdata, exponents=None):
+    # 创建文件夹
+    savefoldpath = os.path.dirname(savepath)
+    if not os.path.exists(savefoldpath):
+        os.makedirs(savefoldpath)
+
+    # 坐标文件路径
+    gridpath = savepath[:-4] + '.npz'
+    if exponents is None:
+        exponents = np.full(len(epochs), -1)
+
+    # 先写临时文件再重命名, 中断时不留下不完整文件
+    with open(gridpath + '.tmp', 'wb') as f:
+        np.savez(f, epochs=np.array(epochs, dtype='datetime64[s]'),
+            hgt=hgt, lons=np.asarray(lons,dtype=float),
+            lats=np.asarray(lats,dtype=float),
+            exponents=np.asarray(exponents,dtype=np.int8))
+    with open(savepath + '.tmp', 'wb') as f:
+        np.save(f, np.asarray(npdata, dtype=np.float32))
+    os.replace(gridpath + '.tmp', gridpath)
+    os.replace(savepath + '.tmp', savepath)
+
+##----------------------------------------------------------------------##
+# INFO: 读取指定时间范围与经纬度范围的TEC数据 (npy存储)
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   stime       - 开始时间 [datetime]
+#   etime       - 结束时间 [datetime] (包含)
+#   lonlim      - 经度范围 [lon1,lon2], None时不限
+#   latlim      - 纬度范围 [lat1,lat2], None时不限
+#   product     - 产品名称, 见PRODUCTS
+#   grid        - 插值目标网格, 见GRIDS
+#   concat      - 多天时是否拼接为一个数组
+#   scale       - 是否按每幅地图的指数换算为TECU; False时为存储的原始值
+#                 (单位10^exponent TECU, 指数见.npz中的exponents)
+# Outputs:
+#   epochs      - 历元 [datetime64[s], (n,)]; concat为False时为每天的列表
+#   lons        - 经度 [1D]
+#   lats        - 纬度 [1D]
+#   tec         - TEC数据 [(n,n_lat,n_lon)]; scale为True时为所选范围的TECU
+#                 副本; scale为False且仅一天时为内存映射视图 (不复制).
+#                 多天且concat为True时拼接为一个数组, 为False时为每天的
+#                 数组列表
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def read_TEC(rootpath, stime, etime, lonlim=None, latlim=None,
+    product=DEFAULT_PRODUCT, grid=DEFAULT_GRID, concat=True, scale=True):
+    foldpath = get_TEC_foldpath(rootpath, product, grid)
+    st = np.datetime64(stime, 's')
+    et = np.datetime64(etime, 's')
+
+    epochs = []
+    tec = []
+    lons = lats = None
+    # 遍历日期
+    date = datetime.datetime(stime.year,stime.month,stime.day)
+    while date <= etime:
+        filepath = os.path.join(foldpath, \
+            '{:%Y/%m}/Ass{:%Y%m%d}TEC.npy'.format(date,date))
+        date += datetime.timedelta(days=1)
+        if not os.path.exists(filepath):
+            continue
+
+        with np.load(filepath[:-4] + '.npz') as coords:
+            depochs = coords['epochs']
+            dlons = coords['lons']
+            dlats = coords['lats']
+            # 没有指数的存储为0.1 TECU
+            dexps = coords['exponents'] if 'exponents' in coords.files else \
+                np.full(len(depochs), -1)
+
+        # 经纬度索引 (规则网格, 取连续区间)
+        ilon = np.nonzero(in_range(dlons, lonlim))[0]
+        ilat = np.nonzero(in_range(dlats, latlim))[0]
+        if len(ilon) == 0 or len(ilat) == 0:
+            raise ValueError('经纬度范围与网格{:s}无交集: lon {}, lat {}'.format(
+                grid, lonlim, latlim))
+
+        # 时间索引 (前一天的最后一幅地图可能与当天第一幅相同, 不重复读取)
+        it = np.nonzero((depochs>=st) & (depochs<=et))[0]
+        if len(epochs) > 0:
+            it = it[depochs[it] > epochs[-1][-1]]
+        if len(it) == 0:
+            continue
+
+        npdata = np.load(filepath, mmap_mode='r')
+        epochs.append(depochs[it[0]:it[-1]+1])
+        dtec = npdata[it[0]:it[-1]+1, ilat[0]:ilat[-1]+1, ilon[0]:ilon[-1]+1]
+        if scale:
+            # 每幅地图的指数 (原始值*10^exponent为TECU)
+            factor = 10.0**dexps[it[0]:it[-1]+1].astype(float)
+            dtec = dtec * factor.astype(np.float32)[:,None,None]
+        tec.append(dtec)
+        lons = dlons[ilon[0]:ilon[-1]+1]
+        lats = dlats[ilat[0]:ilat[-1]+1]
+
+    if not concat:
+        return epochs, lons, lats, tec
+    if len(tec) == 0:
+        return np.array([],dtype='datetime64[s]'), lons, lats, None
+    if len(tec) == 1:
+        return epochs[0], lons, lats, tec[0]
+    return np.concatenate(epochs), lons, lats, np.concatenate(tec)
+
+def in_range(values, lim):
+    if lim is None:
+        return np.ones(len(values), dtype=bool)
+    return (values>=min(lim)) & (values<=max(lim))
+
+##----------------------------------------------------------------------##
+# INFO: 解析IONEX文本行, 插值并存储一天的TEC数据
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   iy          - 年份
+#   iday        - Day of Year
+#   lines       - IONEX文件文本行 (可迭代对象, 单次遍历)
+#   modes       - 存储格式 'npy'/'txt', 见resave_TEC
+#   product     - 产品名称, 见PRODUCTS
+#   grid        - 插值目标网格, 见GRIDS
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def save_TEC(rootpath, iy, iday, lines, modes=('npy',),
+    product=DEFAULT_PRODUCT, grid=DEFAULT_GRID):
+    # 存储路径
+    npypath, savefoldpath = get_TEC_paths(rootpath, iy, iday, product, grid)
+
+    # 解析全部TEC地图
+    header, epochs, exponents, tec = read_ionex(lines)
+
+    # 目标网格
+    lons2, lats2 = GRIDS[grid]
+
+    # 数据插值 (一次处理全部地图)
+    npdata = regrid_maps(tec, header['lons'], header['lats'], lons2, lats2,
+        'cubic')
+
+    # 存储数据
+    if 'npy' in modes:
+        save_TEC_npy(npypath, epochs, header['hgt'], lons2, lats2, npdata,
+            exponents)
+    if 'txt' in modes:
+        save_TEC_txt(savefoldpath, epochs, header['hgt'], lons2, lats2, npdata,
+            exponents)
+
+##----------------------------------------------------------------------##
+# INFO: 重新存储指定年指定天的TEC数据
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   iy          - 年份
+#   iday        - Day of Year
+#   modes       - 存储格式 'npy' (每天一个二进制文件) / 'txt' (每幅地图
+#                 一个文本文件)
+#   product     - 产品名称, 见PRODUCTS
+#   grid        - 插值目标网格, 见GRIDS
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/31，04/01,19; 2026/10/18
+##----------------------------------------------------------------------##
+def resave_TEC(rootpath, iy, iday, modes=('npy',), product=DEFAULT_PRODUCT,
+    grid=DEFAULT_GRID):
+    # 压缩文件及解压文件绝对路径
+    zfilepath = get_Z_paths(rootpath, iy, iday, product)[1]
+    filepath = get_unpacked_path(zfilepath)
+    # 判断压缩文件是否存在
+    if not os.path.exists(zfilepath):
+        print("无数据")
+        return
+
+    # 需要存储的格式
+    todo = get_TEC_todo(rootpath, iy, iday, modes, product, grid, zfilepath)
+
+    # 所有文件已存在则终止
+    if len(todo) == 0:
+        print("数据文件已存在")
+        return
+
+    # 逐行解压并解析全部TEC地图 (已解压时直接读取解压文件, 否则同时写入)
+    save_TEC(rootpath, iy, iday, iter_ionex_lines(zfilepath, filepath), todo,
+        product, grid)
     
     # 打印提示
     print("存储完成")
 
 ##----------------------------------------------------------------------##
-# INFO: 重新存储2021年至今的TEC数据至txt文件
+# INFO: 重新存储2021年至今的TEC数据
 ##----------------------------------------------------------------------##
 # Inputs:
 #   rootpath    - 根目录
+#   nworkers    - 进程数, 1时在本进程中处理
+#   modes       - 存储格式, 见resave_TEC
+#   product     - 产品名称, 见PRODUCTS
+#   grid        - 插值目标网格, 见GRIDS
+# Outputs:
+#   failed      - 失败的日期及异常信息 [(iy,iday,error), ...]
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/31，04/01, 05/12
+# date: 2022/03/31，04/01, 05/12; 2026/10/18
 ##----------------------------------------------------------------------##
-def resave_TEC_all(rootpath):
+def resave_TEC_all(rootpath, nworkers=1, modes=('npy',),
+    product=DEFAULT_PRODUCT, grid=DEFAULT_GRID):
     # 
     print("下载完成, 提取TEC数据.")
 
-    # 获取当前世界时
-    utc = datetime.datetime.utcnow()
+    days = get_days()
+    args = [(resave_TEC,rootpath,iy,iday,modes,product,grid)
+        for iy,iday in days]
+    if nworkers > 1:
+        # 每天的数据相互独立, 在进程池中处理并按顺序输出
+        with ProcessPoolExecutor(max_workers=nworkers) as executor:
+            results = executor.map(run_captured, *zip(*args))
+            failed = report_days(days, results, '存储')
+    else:
+        results = (run_captured(*each) for each in args)
+        failed = report_days(days, results, '存储')
 
-    # 倒叙 year
-    for iy in range(utc.year,2020,-1):
-        if iy == utc.year:
-            sday = (utc-datetime.datetime(utc.year,1,1)).days + 1
-            eday = 0
-        elif iy == 2021:
-            sday = 365
-            eday = 273
-        else:
-            sday = 365
-            eday = 0
-        
-        # 倒叙 DoY
-        for iday in range(sday,eday,-1):
-            try:
-                print("正在存储{:d}年第{:03d}天数据".format(iy,iday))
-                resave_TEC(rootpath,iy,iday)
-            except:
-                print("ERROR: {:d}年第{:03d}天数据存储失败".format(iy,iday))
+    return failed
 
 ##----------------------------------------------------------------------##
 if __name__ == '__main__':
     # 存储根目录
     rootpath = '/Volumes/Washy5T/SpaceWeather/GimMap'
+    # 进程数
+    nworkers = os.cpu_count()
+    # ftp连接数
+    nconn = 4
     # 下载2021年至今的数据
-    download_uqrg_all(rootpath)
-    resave_TEC_all(rootpath)
+    download_uqrg_all(rootpath, nworkers, nconn)
+    resave_TEC_all(rootpath, nworkers)
     
 
 
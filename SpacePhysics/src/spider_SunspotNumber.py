@@ -4,85 +4,220 @@ date: 2022-03-21,23 Washy [CUG washy21@163.com]
 '''
 
 import os
-import sys
-import socket
+import glob
 import datetime
+import threading
+import numpy as np
 
-from ftplib import FTP
-from ftplib import error_perm
+from concurrent.futures import ThreadPoolExecutor
+
+from ftp_utils import ftp_pool
+from ftp_utils import ftp_stat
+from ftp_utils import ftp_pooled
+from ftp_utils import ftp_close_pool
+from ftp_utils import ftp_download
+from fetch_engine import make_task
+from fetch_engine import make_dataset
+from sync_manifest import is_synced
+from sync_manifest import load_manifest
+from sync_manifest import save_manifest
+from sync_manifest import update_manifest
+
+# DSD (Daily Solar Data) 文件每行16列: 年 月 日 10.7cm射电流量 太阳黑子数
+# 黑子面积 新活动区数 太阳平均磁场 X射线背景通量 耀斑数(C M X S 1 2 3),
+# 年月日合并为日期
+DSD_DTYPE = np.dtype([
+    ('date', 'M8[D]'),
+    ('flux', 'i2'),         # 10.7cm射电流量 [sfu]
+    ('ssn', 'i2'),          # 太阳黑子数
+    ('area', 'i4'),         # 黑子面积 [10^-6 半球]
+    ('new_regions', 'i2'),  # 新活动区数
+    ('mean_field', 'i2'),   # 太阳平均磁场 (Stanford)
+    ('xray_bkgd', 'f4'),    # X射线背景通量 [W/m^2], 缺测为nan
+    ('flares_c', 'i2'),     # X射线耀斑数 C M X
+    ('flares_m', 'i2'),
+    ('flares_x', 'i2'),
+    ('flares_s', 'i2'),     # 光学耀斑数 S 1 2 3
+    ('flares_1', 'i2'),
+    ('flares_2', 'i2'),
+    ('flares_3', 'i2'),
+])
+# 整数列缺测值
+DSD_MISSING = -999
+# X射线背景通量等级 [W/m^2]
+XRAY_CLASS = {'A': 1e-8, 'B': 1e-7, 'C': 1e-6, 'M': 1e-5, 'X': 1e-4}
+# 逐日太阳指数表 (SunspotNumber/Data下, DSD_DTYPE结构化数组, 按日期排序)
+SOLAR_TABLE = 'solar_daily.npy'
+# 多线程下载时更新太阳指数表的锁
+SOLAR_LOCK = threading.Lock()
+
+# 季度文件所在的ftp站点及文件夹
+FTP_HOST = 'ftp.swpc.noaa.gov'
+FTP_FOLDER = '/pub/indices/old_indices'
+# 季度结束后数据完整所需的时间 (最后一天的数据次日发布)
+CLOSE_DELAY = datetime.timedelta(days=1)
 
 ##----------------------------------------------------------------------##
-# INFO: ftp网站连接
+# INFO: 逐行读取DSD文件的数据行
 ##----------------------------------------------------------------------##
+# Inputs:
+#   filepath    - DSD文件路径
+#   idxf        - 文件头行数, None时跳过以':'或'#'开头的行
 # Outputs:
-#   ftp         - ftp根目录
+#   fields      - 每个数据行的16个字段 [生成器, list of str]
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/21,23
-##----------------------------------------------------------------------##
-def ftp_connect():
-    # FTP站点
-    host = 'ftp.swpc.noaa.gov'
-    # 端口号
-    port = 21
-    # 文件夹路径
-    folderpath = '/pub/indices/old_indices'
- 
-    ftp = FTP()
-    ftp.encoding = 'utf-8'
-    
-    try:
-        ftp.connect(host, port)
-        ftp.login()
-        ftp.cwd(folderpath)
-    except(socket.error, socket.gaierror):  # ftp 连接错误
-        print("ERROR: cannot connect [{}:{}]".format(host, port))
-        return None
-    except error_perm:  # 用户登录认证错误
-        print("ERROR: user Authentication failed ")
-        return None
-    
-    return ftp
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def iter_dsd_rows(filepath, idxf=None):
+    with open(filepath, 'r') as f:
+        # 跳过文件头
+        if idxf is not None:
+            for i in range(idxf): next(f, None)
+        for line in f:
+            if line.startswith((':', '#')):
+                continue
+            fields = line.split()
+            if len(fields) == 16:
+                yield fields
+            elif len(fields) > 0:
+                print('WARNING: 跳过无法解析的行: ' + line.rstrip())
 
-def is_ftp_file(ftp_conn, filename):
-    try:
-        if filename in ftp_conn.nlst(os.path.dirname(filename)):
-            return True
-        else:
-            return False
-    except error_perm:
-        return False
+def parse_int(text):
+    return int(text) if text.lstrip('-').isdigit() else DSD_MISSING
+
+def parse_xray(text):
+    if len(text) > 1 and text[0] in XRAY_CLASS:
+        try:
+            return XRAY_CLASS[text[0]] * float(text[1:])
+        except ValueError:
+            pass
+    return np.nan
+
+##----------------------------------------------------------------------##
+# INFO: 读取DSD文件的全部列
+##----------------------------------------------------------------------##
+# Inputs:
+#   filepath    - DSD文件路径
+#   idxf        - 文件头行数, None时跳过以':'或'#'开头的行
+# Outputs:
+#   data        - 逐日数据 [结构化数组, DSD_DTYPE, (n,)]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def read_dsd(filepath, idxf=None):
+    rows = []
+    for f in iter_dsd_rows(filepath, idxf):
+        rows.append(('{:s}-{:s}-{:s}'.format(f[0], f[1].zfill(2),
+            f[2].zfill(2)),) + tuple(parse_int(each) for each in f[3:8]) + \
+            (parse_xray(f[8]),) + tuple(parse_int(each) for each in f[9:]))
+
+    return np.array(rows, dtype=DSD_DTYPE)
+
+##----------------------------------------------------------------------##
+# INFO: 将逐日数据合并到太阳指数表 (同一日期以新数据为准)
+##----------------------------------------------------------------------##
+# Inputs:
+#   folderpath  - 数据文件夹绝对路径
+#   data        - 逐日数据 [DSD_DTYPE] 或其列表
+# Outputs:
+#   table       - 合并后的太阳指数表 [DSD_DTYPE, (n,)]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def update_solar_table(folderpath, data):
+    tablepath = os.path.join(folderpath, SOLAR_TABLE)
+    parts = list(data) if isinstance(data, list) else [data]
+    if os.path.exists(tablepath):
+        parts.insert(0, np.load(tablepath))
+    table = np.concatenate(parts).astype(DSD_DTYPE)
+
+    # 稳定排序后保留每个日期的最后一条 (即最新的数据)
+    table = table[np.argsort(table['date'], kind='stable')]
+    keep = np.append(table['date'][1:] != table['date'][:-1], True)
+    table = table[keep]
+
+    # 先写临时文件再重命名
+    with open(tablepath + '.tmp', 'wb') as f:
+        np.save(f, table)
+    os.replace(tablepath + '.tmp', tablepath)
+
+    return table
+
+##----------------------------------------------------------------------##
+# INFO: 由本地DSD文件一次性生成太阳指数表
+##----------------------------------------------------------------------##
+# Inputs:
+#   folderpath  - 数据文件夹绝对路径 (保存太阳指数表)
+#   pattern     - DSD文件路径匹配规则, 如'/data/DSD/*_DSD.txt'; 文件按名称
+#                 排序, 同一日期以排在后面的文件为准
+# Outputs:
+#   table       - 太阳指数表 [DSD_DTYPE, (n,)]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def build_solar_table(folderpath, pattern):
+    tablepath = os.path.join(folderpath, SOLAR_TABLE)
+    if os.path.exists(tablepath):
+        os.remove(tablepath)
+
+    return update_solar_table(folderpath,
+        [read_dsd(each) for each in sorted(glob.glob(pattern))])
+
+##----------------------------------------------------------------------##
+# INFO: 读取指定日期范围的太阳指数
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   stime       - 开始日期 [datetime], None时不限
+#   etime       - 结束日期 [datetime] (包含), None时不限
+# Outputs:
+#   data        - 逐日太阳指数 [DSD_DTYPE, (n,)], 内存映射视图;
+#                 按列访问如 data['flux'] data['ssn']
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def read_solar_table(rootpath, stime=None, etime=None):
+    table = np.load(os.path.join(rootpath, 'SunspotNumber/Data', SOLAR_TABLE),
+        mmap_mode='r')
+
+    i0 = 0 if stime is None else np.searchsorted(table['date'],
+        np.datetime64(stime, 'D'), 'left')
+    i1 = len(table) if etime is None else np.searchsorted(table['date'],
+        np.datetime64(etime, 'D'), 'right')
+
+    return table[i0:i1]
 
 ##----------------------------------------------------------------------##
 # INFO: 对从ftp下载的数据文件进行重新存储
 ##----------------------------------------------------------------------##
+#   单次遍历文件, 按(年,月)分组后每月写一个文件 (多年的DSD文件中不同年份
+#   的同一月份不会合并).
+##----------------------------------------------------------------------##
 # Inputs:
 #   folderpath  - 重新存储数据的文件夹绝对路径
 #   filepath    - 需要重新存储的原始数据文件绝对路径
+#   idxf        - 文件头行数
+#   flag        - True时跳过已存在的月份文件
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/21,23
+# date: 2022/03/21,23; 2026/10/18
 ##----------------------------------------------------------------------##
 def resave_quarter_sn(folderpath, filepath, idxf=13, flag=True):
-    # 打开数据文件
-    with open(filepath, 'r') as f:
-        # 跳过前13行
-        for i in range(idxf): next(f)
-        # 读取数据
-        data = f.read().split()
-
-    # 提取 年 月 日 太阳黑子数
-    data_y = data[0::16]
-    data_m = data[1::16]
-    data_d = data[2::16]
-    data_sn = data[4::16]
+    # 按(年,月)分组 年 月 日 太阳黑子数
+    months = {}
+    for f in iter_dsd_rows(filepath, idxf):
+        months.setdefault((f[0], f[1]), []).append(
+            '%4s  %2s  %2s  %4s\n' % (f[0], f[1], f[2], f[4]))
 
     # 遍历所有的月份
-    for each in sorted(list(set(data_m))):
-        # 每个月份数据的起始索引
-        idxm = data_m.index(each)
+    for (year, month), lines in sorted(months.items()):
         # 保存文件名
-        savename = data_y[idxm] + data_m[idxm] + '.txt'
+        savename = year + month + '.txt'
         # 保存文件名绝对路径
         savepath = os.path.join(folderpath, savename)
         
@@ -91,74 +226,145 @@ def resave_quarter_sn(folderpath, filepath, idxf=13, flag=True):
             continue
         
         print('正在下载: ' + savename)
-        # 另存文件
-        f = open(savepath, 'w')
-        # 生成表头
-        f.write('YYYY  MM  DD  SunspotNumber\n')
-        # 循环所有数据
-        for idx in range(idxm,len(data_m)):
-            # 月份不同时跳出循环
-            if data_m[idx] != data_m[idxm]:
-                break
-            # 存入当前月份数据
-            f.write('%4s  %2s  %2s  %4s\n' % (data_y[idx], data_m[idx], \
-                data_d[idx], data_sn[idx]))
-        # 关闭文件
-        f.close()
+        # 另存文件 (生成表头)
+        with open(savepath, 'w') as f:
+            f.write('YYYY  MM  DD  SunspotNumber\n')
+            f.writelines(lines)
+
+##----------------------------------------------------------------------##
+# INFO: 季度文件的结束时间与包含的月份
+##----------------------------------------------------------------------##
+# Inputs:
+#   filename    - FTP文件名 yyyyQn_DSD.txt 或 yyyy_DSD.txt
+# Outputs:
+#   closetime   - 文件数据完整的时间 (季度/年结束后CLOSE_DELAY) [datetime]
+#   months      - 包含的月份 ['yyyymm', ...]
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_quarter_info(filename):
+    year = int(filename[:4])
+    if filename[4] == 'Q':
+        quarter = int(filename[5])
+        months = [3*(quarter-1) + i for i in range(1,4)]
+    else:
+        months = list(range(1,13))
+
+    # 下一季度/年的第一天
+    if months[-1] == 12:
+        closetime = datetime.datetime(year+1, 1, 1)
+    else:
+        closetime = datetime.datetime(year, months[-1]+1, 1)
+
+    return closetime + CLOSE_DELAY, \
+        ['{:d}{:02d}'.format(year, month) for month in months]
+
+##----------------------------------------------------------------------##
+# INFO: 判断季度文件是否已完成 (已结束, 结束后已下载, 月份文件均已生成)
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   filename    - FTP文件名
+#   manifest    - 同步清单
+# Outputs:
+#   flag        - True/False 已完成 (无需访问网络)/需要同步
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def is_quarter_done(rootpath, filename, manifest):
+    closetime, months = get_quarter_info(filename)
+    if datetime.datetime.utcnow() < closetime:
+        return False
+
+    # 原始文件已完整下载且下载时间在季度结束之后
+    key = FTP_FOLDER + '/' + filename
+    rawpath = os.path.join(rootpath, 'SunspotNumber/DSD', filename)
+    if not is_synced(manifest, key, rawpath):
+        return False
+    if datetime.datetime.strptime(manifest[key]['time'],
+        '%Y-%m-%dT%H:%M:%S') < closetime:
+        return False
+
+    return months_exist(rootpath, months)
+
+def months_exist(rootpath, months):
+    folderpath = os.path.join(rootpath, 'SunspotNumber/Data')
+    # 只检查已有数据的月份 (进行中的季度)
+    last = (datetime.datetime.utcnow() - CLOSE_DELAY).strftime('%Y%m')
+    return all(os.path.exists(os.path.join(folderpath, each + '.txt'))
+        for each in months if each <= last)
 
 ##----------------------------------------------------------------------##
 # INFO: 下载指定FTP文件并重新存储
 ##----------------------------------------------------------------------##
+#   原始文件保存为SunspotNumber/DSD/filename (每个文件单独的.part临时文件,
+#   可并行下载); 远程文件无变化且月份文件齐全时跳过.
+##----------------------------------------------------------------------##
 # Inputs:
 #   ftp         - ftp
 #   rootpath    - 根目录
 #   filename    - FTP文件名
+#   manifest    - 同步清单, None时总是下载
+# Outputs:
+#   flag        - True/False 已更新/无需更新或文件不存在
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/21,23
+# date: 2022/03/21,23; 2026/10/18
 ##----------------------------------------------------------------------##
-def download_sn(ftp, rootpath, filename):
+def download_sn(ftp, rootpath, filename, manifest=None):
     # 创建文件夹
     folderpath = os.path.join(rootpath, 'SunspotNumber/Data')
-    if not os.path.exists(folderpath):
-        os.makedirs(folderpath)
-    # 临时文件
-    tempfilepath = os.path.join(folderpath, 'temp.txt')
-    # FTP: 文件名是否存在
-    if is_ftp_file(ftp, filename):
-        # 下载指定文件到临时文件
-        with open(tempfilepath, 'wb') as f:
-            ftp.retrbinary('RETR ' + filename, f.write, 1024)
-    else:
+    dsdpath = os.path.join(rootpath, 'SunspotNumber/DSD')
+    for each in (folderpath, dsdpath):
+        if not os.path.exists(each):
+            os.makedirs(each, exist_ok=True)
+    # 原始文件
+    rawpath = os.path.join(dsdpath, filename)
+    ftppath = FTP_FOLDER + '/' + filename
+
+    # FTP: 文件属性 (文件名不存在时为None)
+    remote = ftp_stat(ftp, ftppath)
+    if remote is None:
         print('文件不存在: ' + filename)
-        sys.exit()
+        return False
+
+    if manifest is not None and is_synced(manifest, ftppath, rawpath, remote):
+        # 远程文件无变化
+        if months_exist(rootpath, get_quarter_info(filename)[1]):
+            print('文件无更新: ' + filename)
+            return False
+    else:
+        # 下载指定文件 (断点续传, 完成后重命名)
+        ftp_download(ftp, ftppath, rawpath, remote)
+        if manifest is not None:
+            update_manifest(manifest, ftppath, rawpath, remote)
     
     year = int(filename[:4])
     if year==1997 or year in range(2000,2007):
         idxf = 12
     else:
         idxf = 13
-    # 判断是否跳过本年数据
-    if year==datetime.datetime.utcnow().year:
-        flag = False
-    else:
-        flag = True
-    # 数据重新存储
-    resave_quarter_sn(folderpath, tempfilepath, idxf, flag)
+    # 数据重新存储 (原始文件有更新, 覆盖已有的月份文件)
+    resave_quarter_sn(folderpath, rawpath, idxf, False)
+    # 全部列合并到太阳指数表
+    data = read_dsd(rawpath, idxf)
+    with SOLAR_LOCK:
+        update_solar_table(folderpath, data)
+
+    return True
 
 ##----------------------------------------------------------------------##
-# INFO: 下载2018年至今的太阳黑子数
+# INFO: 获取2018年至今的季度文件名
 ##----------------------------------------------------------------------##
-# Inputs:
-#   rootpath    - 根目录
+# Outputs:
+#   filenames   - FTP文件名列表
 ##----------------------------------------------------------------------##
 # author: Washy [CUG washy21@163.com]
-# date: 2022/03/21,23
+# date: 2022/03/21,23; 2026/10/18
 ##----------------------------------------------------------------------##
-def download_sn_all(rootpath):
-    # 连接站点
-    ftp = ftp_connect()
-    
+def get_sn_filenames():
     # 获取当前世界时
     date = datetime.datetime.utcnow()
     
@@ -166,32 +372,107 @@ def download_sn_all(rootpath):
     # for year in range(1997,2018):
     #     # FTP文件名
     #     filename = '{:d}_DSD.txt'.format(year)
-    #     # 下载数据
-    #     download_sn(ftp, rootpath, filename)
-    
+
+    filenames = []
     # 爬取2018年至前一年的数据
     for year in range(2018, date.year):
         for idx in range(1,5):
             # FTP文件名
-            filename = '{:d}Q{:d}_DSD.txt'.format(year,idx)
-            # 下载数据
-            download_sn(ftp,rootpath,filename)
+            filenames.append('{:d}Q{:d}_DSD.txt'.format(year,idx))
     
     # 本年索引上限
     idx_now = (date.month-1)//3 + 2
     # 爬取本年的数据
     for idx in range(1,idx_now):
         # FTP文件名
-        filename = '{:d}Q{:d}_DSD.txt'.format(date.year,idx)
-        # 下载数据
-        download_sn(ftp,rootpath,filename)
-    
-    # 断开站点
-    ftp.quit()
+        filenames.append('{:d}Q{:d}_DSD.txt'.format(date.year,idx))
+
+    return filenames
+
+##----------------------------------------------------------------------##
+# INFO: 获取需要同步的季度文件 (跳过已完成的季度)
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   manifest    - 同步清单
+# Outputs:
+#   filenames   - FTP文件名列表
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_sn_todo(rootpath, manifest):
+    filenames = get_sn_filenames()
+    todo = [each for each in filenames
+        if not is_quarter_done(rootpath, each, manifest)]
+    print('季度文件: 共{:d}个, 已完成{:d}个'.format(len(filenames),
+        len(filenames)-len(todo)))
+
+    return todo
+
+##----------------------------------------------------------------------##
+# INFO: 下载2018年至今的太阳黑子数
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+#   nconn       - 同时下载的文件数 (ftp连接数)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2022/03/21,23; 2026/10/18
+##----------------------------------------------------------------------##
+def download_sn_all(rootpath, nconn=2):
+    # 同步清单
+    manifestpath = os.path.join(rootpath, 'SunspotNumber/DSD/manifest.json')
+    manifest = load_manifest(manifestpath)
+
+    # 需要同步的季度
+    todo = get_sn_todo(rootpath, manifest)
+
+    # 连接池 (使用时再连接)
+    pool = ftp_pool(FTP_HOST, nconn)
+
+    try:
+        with ThreadPoolExecutor(max_workers=nconn) as executor:
+            futures = [executor.submit(ftp_pooled, pool, download_sn, rootpath,
+                filename, manifest) for filename in todo]
+            for filename, each in zip(todo, futures):
+                error = each.exception()
+                if error is not None:
+                    print('ERROR: {:s}下载失败 ({})'.format(filename, error))
+    finally:
+        # 保存同步清单
+        save_manifest(manifestpath, manifest)
+
+        # 断开站点
+        ftp_close_pool(pool)
+
+##----------------------------------------------------------------------##
+# INFO: 数据集定义 (供fetch_engine与其他数据集并发下载)
+##----------------------------------------------------------------------##
+# Inputs:
+#   rootpath    - 根目录
+# Outputs:
+#   dataset     - 数据集 (每个未完成的季度一个下载任务)
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def get_dataset(rootpath):
+    manifestpath = os.path.join(rootpath, 'SunspotNumber/DSD/manifest.json')
+    manifest = load_manifest(manifestpath)
+
+    tasks = [make_task('ftp', FTP_HOST, download_sn, rootpath,
+        filename, manifest, name='SunspotNumber ' + filename)
+        for filename in get_sn_todo(rootpath, manifest)]
+
+    return make_dataset('SunspotNumber', tasks,
+        lambda: save_manifest(manifestpath, manifest))
 
 ##----------------------------------------------------------------------##
 if __name__ == '__main__':
     # 存储根目录
     rootpath = '/Volumes/Washy5T/SpaceWeather'
+    # ftp连接数
+    nconn = 2
     # 下载所有的太阳黑子数
-    download_sn_all(rootpath)
+    download_sn_all(rootpath, nconn)
@@ -5,23 +5,59 @@
 import os
 import re
 import requests
+import datetime
+
+from concurrent.futures import ThreadPoolExecutor
 
 import urllib3
 urllib3.disable_warnings()
 
-# 获取单个数据文件
-def download_data(url):
+from http_utils import http_session
+from http_utils import http_download
+from fetch_engine import make_task
+from fetch_engine import make_dataset
+from fetch_engine import fetch_datasets
+from fetch_engine import register_backend
+from sync_manifest import is_synced
+from sync_manifest import http_facts
+from sync_manifest import load_manifest
+from sync_manifest import save_manifest
+from sync_manifest import update_manifest
+
+# 数据网站主机
+SWARM_HOST = "swarm-diss.eo.esa.int"
+
+# 伪装浏览器请求头
+UserAgent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36"
+
+# 创建会话 (连接池, keep-alive)
+def get_session(nconn=1):
+    session = http_session(nconn, {"User-Agent": UserAgent})
+    session.verify = False
+
+    return session
+
+# fetch_engine连接后端: 带浏览器请求头且不校验证书的会话
+register_backend("swarm", lambda host, limit: get_session(limit),
+    lambda session: session.close())
+
+# 获取单个数据文件 (请求失败时抛出异常, 错误页不会被当作空列表页)
+def download_data(url, session=None):
     headers = {
-        "User-Agent" : "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36"
+        "User-Agent" : UserAgent
     }
 
-    res = requests.get(url, headers=headers, verify=False)
+    if session is None:
+        res = requests.get(url, headers=headers, verify=False)
+    else:
+        res = session.get(url)
+    res.raise_for_status()
     
     return res
 
 # 获取所有数据文件名
-def getnames(url,sat):
-    res = download_data(url)
+def getnames(url,sat,session=None):
+    res = download_data(url,session)
     html = res.text
     
     r_name = '"SW_OPER_EFI{}_LP_1B_\d+T\d+_\d+T\d+_05\d+.CDF.ZIP"'.format(sat)
@@ -29,40 +65,182 @@ def getnames(url,sat):
     
     return names
 
-# 主函数
-def main(sat,sNum,tNum,savepath):
+# 列表页url
+def get_listurl(sat,pos,maxfiles):
+    return "https://swarm-diss.eo.esa.int/?do=list&maxfiles="+ \
+        str(maxfiles) + "&pos="+ str(pos) + \
+        "&file=swarm%2FLevel1b%2FLatest_baselines%2FEFIx_LP%2FSat_" + sat
+
+# 解析文件名 -> (卫星, 开始时间, 结束时间, 版本号)
+r_file = re.compile(r'SW_OPER_EFI([ABC])_LP_1B_(\d{8}T\d{6})_(\d{8}T\d{6})_(\d{4})\.CDF\.ZIP')
+def parse_name(name):
+    m = r_file.fullmatch(name)
+    if m is None:
+        return None
+    sat, start, end, version = m.groups()
+    return (sat, datetime.datetime.strptime(start, "%Y%m%dT%H%M%S"),
+        datetime.datetime.strptime(end, "%Y%m%dT%H%M%S"), int(version))
+
+# 获取单个列表页中的所有文件名 (所有版本)
+def getpage(sat,pos,maxfiles,session=None):
+    html = download_data(get_listurl(sat,pos,maxfiles),session).text
+    return sorted(set(m.group(0) for m in r_file.finditer(html)))
+
+# 遍历卫星的全部列表页, 返回时间范围内每个时段最新版本的文件名
+# (列表页请求失败时抛出异常, 不返回不完整的目录)
+#   sat         - 卫星 A B C
+#   stime       - 开始时间 [datetime], None时不限
+#   etime       - 结束时间 [datetime], None时不限
+#   pagesize    - 每页文件数
+#   nconn       - 同时请求的列表页数
+def get_catalog(sat,stime=None,etime=None,pagesize=500,nconn=4,session=None):
+    if session is None:
+        session = get_session(nconn)
+
+    # 每次并行请求nconn页, 直至出现不足pagesize的页 (最后一页) 或与上一页
+    # 相同的页 (超出末尾时服务器可能重复返回最后一页), 其后的页不再计入
+    names = []
+    pos = 0
+    last = None
+    done = False
+    with ThreadPoolExecutor(max_workers=nconn) as executor:
+        while not done:
+            poss = [pos + i*pagesize for i in range(nconn)]
+            pages = list(executor.map(
+                lambda each: getpage(sat,each,pagesize,session), poss))
+            for page in pages:
+                if page == last:
+                    done = True
+                    break
+                names.extend(page)
+                last = page
+                if len(page) < pagesize:
+                    done = True
+                    break
+            pos += nconn*pagesize
+
+    # 按时段保留最新版本
+    newest = {}
+    for name in set(names):
+        record = parse_name(name)
+        _, start, end, version = record
+        # 时间范围筛选
+        if stime is not None and end < stime:
+            continue
+        if etime is not None and start > etime:
+            continue
+        if start not in newest or version > newest[start][0][3]:
+            newest[start] = (record, name)
+
+    return [newest[each][1] for each in sorted(newest)]
+
+# 文件下载url
+def get_fileurl(sat,name):
+    return "https://swarm-diss.eo.esa.int/?do=download&file=swarm%2"+\
+        "FLevel1b%2FLatest_baselines%2FEFIx_LP%2FSat_{}%2F".format(sat)+name
+
+# 判断文件是否已同步 (Swarm文件名包含版本号, 已完整下载的文件无需检查远程;
+# 清单建立前下载的文件: 与远程大小一致时补记录)
+def check_file(session,manifest,fileurl,filename):
+    if is_synced(manifest, fileurl, filename):
+        return True
+    if os.path.exists(filename):
+        res = session.head(fileurl, allow_redirects=True)
+        return is_synced(manifest, fileurl, filename, http_facts(res.headers))
+    return False
+
+# 同步单个文件 (供fetch_engine使用, 失败时抛出异常由引擎重试)
+def sync_file(session,sat,name,savepath,manifest):
+    filename = os.path.join(savepath, name)
+    fileurl = get_fileurl(sat,name)
+
+    if check_file(session,manifest,fileurl,filename):
+        print("文件已存在: {}".format(name))
+        return
+
+    remote = http_download(fileurl, filename, session=session)
+    print("下载完成: {}".format(name))
+    update_manifest(manifest, fileurl, filename, remote)
+
+# 下载文件名列表中的文件 (跳过已同步的文件, 由fetch_engine并发下载,
+# 失败的文件退避重试)
+#   names   - 文件名列表 (不含引号)
+#   nconn   - 同时下载的文件数
+def download_names(sat,names,savepath,nconn=1):
     # 创建数据目录
     if not os.path.exists(savepath):
         os.makedirs(savepath)
+
+    # 同步清单
+    manifestpath = os.path.join(savepath, "manifest.json")
+    manifest = load_manifest(manifestpath)
+
+    tasks = [make_task("swarm",SWARM_HOST,sync_file,sat,name,savepath,
+        manifest,name="Swarm " + name) for name in names]
+    dataset = make_dataset("Swarm " + sat, tasks,
+        lambda: save_manifest(manifestpath, manifest))
+
+    return fetch_datasets([dataset], limits={SWARM_HOST: nconn})
+
+# 主函数
+#   nconn   - 同时下载的文件数
+def main(sat,sNum,tNum,savepath,nconn=1):
+    # 所有请求共用一个会话
+    session = get_session(nconn)
     
     # 起始链接
-    url = "https://swarm-diss.eo.esa.int/?do=list&maxfiles="+ str(tNum) + \
-        "&pos="+ str(sNum) + \
-        "&file=swarm%2FLevel1b%2FLatest_baselines%2FEFIx_LP%2FSat_" + sat
+    url = get_listurl(sat,sNum,tNum)
     
-    names = getnames(url,sat)
+    names = getnames(url,sat,session)
     
     print("总文件个数: {}".format(len(names)))
-    
-    for each in names:
-        name = each[1:-1]
-        
-        filename = savepath + name
-        
-        if os.path.exists(filename):
-            print("文件已存在: {}".format(name))
-            continue
-        
-        print("正在下载: {}".format(name))
-        
-        fileurl = "https://swarm-diss.eo.esa.int/?do=download&file=swarm%2"+\
-            "FLevel1b%2FLatest_baselines%2FEFIx_LP%2FSat_{}%2F".format(sat)+\
-            name
-        
-        res = download_data(fileurl)
-        
-        with open(filename,"wb") as f:
-            f.write(res.content)
+
+    download_names(sat,[each[1:-1] for each in names],savepath,nconn)
+
+    session.close()
+
+# 同步多颗卫星指定时间范围内的全部数据 (每个时段只下载最新版本)
+#   sats        - 卫星列表, 如 "ABC"
+#   stime       - 开始时间 [datetime]
+#   etime       - 结束时间 [datetime]
+#   rootpath    - 根目录, 数据保存至 rootpath/sat{A,B,C}/
+#   nconn       - 同时请求数
+def sync(sats,stime,etime,rootpath,nconn=4):
+    session = get_session(nconn)
+
+    for sat in sats:
+        names = get_catalog(sat,stime,etime,nconn=nconn,session=session)
+        print("卫星{}文件个数: {}".format(sat,len(names)))
+
+        savepath = os.path.join(rootpath, "sat" + sat)
+        download_names(sat,names,savepath,nconn)
+
+    session.close()
+
+# 数据集定义 (供fetch_engine与其他数据集并发下载)
+#   每颗卫星先由一个任务获取文件目录, 再为每个文件生成下载任务
+def get_dataset(sats,stime,etime,rootpath):
+    manifests = {}
+    for sat in sats:
+        savepath = os.path.join(rootpath, "sat" + sat)
+        if not os.path.exists(savepath):
+            os.makedirs(savepath)
+        manifests[sat] = load_manifest(os.path.join(savepath, "manifest.json"))
+
+    def plan(session,sat):
+        names = get_catalog(sat,stime,etime,nconn=1,session=session)
+        print("卫星{}文件个数: {}".format(sat,len(names)))
+        savepath = os.path.join(rootpath, "sat" + sat)
+        return [make_task("swarm",SWARM_HOST,sync_file,sat,name,savepath,
+            manifests[sat],name="Swarm " + name) for name in names]
+
+    def finalize():
+        for sat in sats:
+            save_manifest(os.path.join(rootpath, "sat" + sat, "manifest.json"),
+                manifests[sat])
+
+    return make_dataset("Swarm", [make_task("swarm",SWARM_HOST,plan,sat,
+        name="Swarm {} 目录".format(sat)) for sat in sats], finalize)
 
 if __name__ == "__main__":
     # 卫星 A B C
@@ -72,8 +250,11 @@ if __name__ == "__main__":
     # 总文件数
     tNum = 1
     
+    # 同时下载的文件数
+    nconn = 4
+    
     # 保存路径
     savepath = "./Swarm/satB/"
     
-    main(sat,sNum,tNum,savepath)
+    main(sat,sNum,tNum,savepath,nconn)
     
@@ -0,0 +1,40 @@
+''' coding: utf-8
+INFO: 在一个进程中并发同步所有数据集 (GimMap, ACE, Dst, 太阳黑子数, Swarm),
+      各主机的并发连接数见 fetch_engine.HOST_LIMITS.
+date: 2026-10-18 Washy [CUG washy21@163.com]
+'''
+
+import datetime
+
+import spider_ACE
+import spider_Dst
+import spider_Swarm
+import spider_GimMap
+import spider_SunspotNumber
+
+from fetch_engine import fetch_datasets
+
+##----------------------------------------------------------------------##
+if __name__ == '__main__':
+    # 存储根目录
+    rootpath = '/Volumes/Washy5T/SpaceWeather'
+    # ACE 开始/结束日期
+    symd = 20180101
+    eymd = int(datetime.datetime.utcnow().strftime('%Y%m%d'))
+
+    datasets = [
+        spider_GimMap.get_dataset(rootpath + '/GimMap'),
+        spider_ACE.get_dataset(rootpath + '/ACE', symd, eymd),
+        spider_Dst.get_dataset(rootpath + '/Data/Dst'),
+        spider_SunspotNumber.get_dataset(rootpath),
+        spider_Swarm.get_dataset('ABC', datetime.datetime(2018,1,1),
+            datetime.datetime.utcnow(), rootpath + '/Swarm'),
+    ]
+
+    # 并发下载
+    failed = fetch_datasets(datasets)
+
+    # 失败的任务
+    for name, tasks in failed.items():
+        for task, error in tasks:
+            print('ERROR: {:s}: {:s}'.format(name, task))
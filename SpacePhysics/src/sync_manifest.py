@@ -0,0 +1,215 @@
+''' coding: utf-8
+INFO: 数据同步清单 (manifest). 记录每个已下载文件的远程属性 (大小、修改时间、
+      ETag) 与本地大小、校验值, 重复运行时只重新下载远程有变化或本地不完整的文件.
+date: 2026-10-18 Washy [CUG washy21@163.com]
+func:
+    load_manifest       - 读取清单文件
+    save_manifest       - 保存清单文件
+    is_synced           - 判断文件是否已同步
+    update_manifest     - 下载完成后更新清单
+    http_facts          - 从HTTP响应头提取远程属性
+    conditional_headers - 生成HTTP条件请求头
+    same_content        - 判断新内容与已同步文件是否相同
+'''
+
+import os
+import json
+import hashlib
+import datetime
+
+# 远程文件的版本标识 (ftp MLSD / HTTP响应头)
+VALIDATORS = ('modify', 'etag', 'last-modified')
+
+##----------------------------------------------------------------------##
+# INFO: 读取清单文件
+##----------------------------------------------------------------------##
+# Inputs:
+#   manifestpath    - 清单文件路径
+# Outputs:
+#   manifest        - {远程路径: 记录}, 文件不存在时为空
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def load_manifest(manifestpath):
+    if not os.path.exists(manifestpath):
+        return {}
+    with open(manifestpath, 'r') as f:
+        return json.load(f)
+
+##----------------------------------------------------------------------##
+# INFO: 保存清单文件 (先写临时文件再重命名)
+##----------------------------------------------------------------------##
+# Inputs:
+#   manifestpath    - 清单文件路径
+#   manifest        - 清单
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def save_manifest(manifestpath, manifest):
+    foldpath = os.path.dirname(manifestpath)
+    if foldpath and not os.path.exists(foldpath):
+        os.makedirs(foldpath)
+
+    with open(manifestpath + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(manifestpath + '.tmp', manifestpath)
+
+##----------------------------------------------------------------------##
+# INFO: 计算文件的sha1校验值
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def file_sha1(filepath):
+    sha = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1<<20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+##----------------------------------------------------------------------##
+# INFO: 判断文件是否已同步
+##----------------------------------------------------------------------##
+# Inputs:
+#   manifest        - 清单
+#   key             - 远程路径/url
+#   localpath       - 本地文件路径, None时不保存本地文件 (只比较远程属性)
+#   remote          - 远程属性 {'size','modify','etag','last-modified'},
+#                     None时不检查远程 (不访问网络)
+#   require_validator - 远程属性中没有修改时间/ETag时视为未同步
+# Outputs:
+#   flag            - True/False 已同步/需要下载
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def is_synced(manifest, key, localpath, remote=None, require_validator=False):
+    entry = manifest.get(key)
+    if localpath is None:
+        if entry is None:
+            return False
+    else:
+        if not os.path.exists(localpath):
+            return False
+        size = os.path.getsize(localpath)
+
+        if entry is None:
+            # 无记录的已有文件 (清单建立前下载): 大小与远程一致时补记录
+            if remote is not None and remote.get('size') is not None and \
+                int(remote['size']) == size:
+                update_manifest(manifest, key, localpath, remote)
+                return True
+            return False
+
+        # 本地文件不完整
+        if size != entry['size']:
+            return False
+    if remote is None:
+        return True
+
+    # 比较远程属性
+    validators = [k for k in VALIDATORS if remote.get(k) is not None]
+    if len(validators) == 0 and require_validator:
+        return False
+    for k in validators + ['size']:
+        if remote.get(k) is not None and \
+            str(remote[k]) != str(entry['remote'].get(k)):
+            return False
+
+    return True
+
+##----------------------------------------------------------------------##
+# INFO: 下载完成后更新清单
+##----------------------------------------------------------------------##
+# Inputs:
+#   manifest        - 清单
+#   key             - 远程路径/url
+#   localpath       - 本地文件路径, None时不保存本地文件 (大小取远程大小)
+#   remote          - 远程属性
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def update_manifest(manifest, key, localpath, remote=None):
+    if localpath is None:
+        size = (remote or {}).get('size')
+        size = None if size is None else int(size)
+        sha1 = None
+    else:
+        size = os.path.getsize(localpath)
+        sha1 = file_sha1(localpath)
+
+    manifest[key] = {
+        'size': size,
+        'sha1': sha1,
+        'remote': {k: v for k, v in (remote or {}).items() if v is not None},
+        'time': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+##----------------------------------------------------------------------##
+# INFO: 从HTTP响应头提取远程属性
+##----------------------------------------------------------------------##
+# Inputs:
+#   headers         - 响应头 (requests.Response.headers)
+# Outputs:
+#   remote          - {'size','etag','last-modified'}
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def http_facts(headers):
+    return {
+        'size': headers.get('Content-Length'),
+        'etag': headers.get('ETag'),
+        'last-modified': headers.get('Last-Modified'),
+    }
+
+##----------------------------------------------------------------------##
+# INFO: 生成HTTP条件请求头 (本地文件完整时使用上次记录的ETag/Last-Modified)
+##----------------------------------------------------------------------##
+# Inputs:
+#   manifest        - 清单
+#   key             - url
+#   localpath       - 本地文件路径
+# Outputs:
+#   headers         - {'If-None-Match','If-Modified-Since'}, 无记录时为空
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def conditional_headers(manifest, key, localpath):
+    if key not in manifest or not is_synced(manifest, key, localpath):
+        return {}
+
+    remote = manifest[key]['remote']
+    headers = {}
+    if remote.get('etag') is not None:
+        headers['If-None-Match'] = remote['etag']
+    if remote.get('last-modified') is not None:
+        headers['If-Modified-Since'] = remote['last-modified']
+
+    return headers
+
+##----------------------------------------------------------------------##
+# INFO: 判断新内容与已同步文件是否相同 (比较大小与sha1, 不读取本地文件)
+##----------------------------------------------------------------------##
+# Inputs:
+#   manifest        - 清单
+#   key             - 远程路径/url
+#   localpath       - 本地文件路径
+#   content         - 新内容 [bytes]
+# Outputs:
+#   flag            - True/False 相同/需要重写
+##----------------------------------------------------------------------##
+# author: Washy [CUG washy21@163.com]
+# date: 2026/10/18
+##----------------------------------------------------------------------##
+def same_content(manifest, key, localpath, content):
+    if not is_synced(manifest, key, localpath):
+        return False
+    entry = manifest[key]
+
+    return len(content) == entry['size'] and \
+        hashlib.sha1(content).hexdigest() == entry['sha1']
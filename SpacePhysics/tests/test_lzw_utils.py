@@ -0,0 +1,78 @@
+''' coding: utf-8
+INFO: lzw_utils的测试. data/中的.Z文件由ncompress压缩make_data的结果生成,
+      解压结果与make_data逐字节比较.
+date: 2026-10-18 Washy [CUG washy21@163.com]
+'''
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lzw_utils import (lzw_decompressor, lzw_decompress, lzw_flush,
+    iter_unlzw, iter_text_lines)
+
+DATA_FOLD = os.path.join(os.path.dirname(__file__), 'data')
+
+# 测试数据: 文件名 -> (长度 [byte], 字母表大小)
+#   small 码长不增加; wide 码长从9位增加到15位
+DATASETS = {
+    'empty': (0, 1),
+    'small': (100, 4),
+    'wide': (30000, 64),
+}
+
+##----------------------------------------------------------------------##
+# INFO: 生成确定的测试数据 (线性同余, 不依赖random的实现)
+##----------------------------------------------------------------------##
+def make_data(n, nsym, seed=1):
+    out = bytearray(n)
+    x = seed
+    for i in range(n):
+        x = (1103515245*x + 12345) & 0x7fffffff
+        out[i] = 0x21 + (x >> 16) % nsym
+    return bytes(out)
+
+def read_fixture(name):
+    with open(os.path.join(DATA_FOLD, name + '.Z'), 'rb') as f:
+        return f.read()
+
+def split_chunks(data, size):
+    return [data[i:i+size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize('name', sorted(DATASETS))
+@pytest.mark.parametrize('chunksize', [1, 7, 1<<16])
+def test_fixture(name, chunksize):
+    zdata = read_fixture(name)
+    expect = make_data(*DATASETS[name])
+    chunks = split_chunks(zdata, chunksize)
+    assert b''.join(iter_unlzw(chunks)) == expect
+
+def test_no_empty_chunks():
+    chunks = split_chunks(read_fixture('wide'), 5)
+    assert all(len(data) > 0 for data in iter_unlzw(chunks))
+
+def test_clear_code():
+    # 码表满16位后压缩率下降时compress写入清表码: 易压缩的数据之后接难压缩
+    # 的数据. 数据较大, 运行时生成
+    ncompress = pytest.importorskip('ncompress')
+    expect = make_data(200000, 4) + make_data(300000, 200, seed=3)
+    zdata = ncompress.compress(expect)
+    assert b''.join(iter_unlzw(split_chunks(zdata, 4096))) == expect
+
+def test_bad_magic():
+    state = lzw_decompressor()
+    with pytest.raises(ValueError):
+        lzw_decompress(state, b'PK\x03\x04')
+
+def test_truncated_header():
+    state = lzw_decompressor()
+    assert lzw_decompress(state, b'\x1f') == b''
+    with pytest.raises(ValueError):
+        lzw_flush(state)
+
+def test_text_lines():
+    chunks = [b'ab', b'c\r\nde', b'\n', b'\nf']
+    assert list(iter_text_lines(chunks)) == ['abc', 'de', '', 'f']